@@ -0,0 +1,191 @@
+# Batch runner: fans seeded headless games out over a process pool and
+# streams one result row per episode (score, frames, outcome, cause of
+# death) to a CSV or JSONL file, then prints an aggregated summary.
+#
+#   python batch.py --episodes 100000 --policy seeker --out results.csv
+#   python batch.py --episodes 100000 --power-duration 300 --ghost-speed 3
+#   python batch.py --policy replay --replay sessions/*.pmr
+#
+# Recordings replay with the swarm, chase, ghost count and level they were
+# recorded with; the other game options come from the command line.
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import headless
+from game import POWER_DURATION
+from replay import load_replay, make_recorded_game, read_replay
+
+FIELDS = ["episode", "seed", "policy", "score", "frames", "win", "end_reason",
+          "pellets_left", "power_pellets_left", "ghosts_left"]
+
+# One Game per worker process and set of game options, reused across jobs
+_worker_games = {}
+
+
+def run_chunk(config, jobs):
+    # Worker: play each (episode, seed, inputs) job and return result rows
+    key = json.dumps(config["game"], sort_keys=True)
+    game = _worker_games.get(key)
+    if game is None:
+        game = _worker_games[key] = make_recorded_game(config["game"])
+
+    rows = []
+    for episode, seed, inputs in jobs:
+        game.reset(seed)
+        if inputs is not None:
+            for action, count in inputs:
+                for _ in range(count):
+                    game.step(action)
+        else:
+            if config["policy"] == "seeker":
+                policy = headless.pellet_seeker_policy()
+            else:
+                policy = headless.random_policy(random.Random(seed))
+            max_frames = config["max_frames"]
+            while not game.done and game.frame < max_frames:
+                game.step(policy(game))
+        rows.append({
+            "episode": episode,
+            "seed": seed,
+            "policy": config["policy"],
+            "score": game.score,
+            "frames": game.frame,
+            "win": game.win,
+            "end_reason": game.end_reason or "unfinished",
+            "pellets_left": game.pellets.count,
+            "power_pellets_left": game.power_pellets.count,
+            "ghosts_left": game.ghosts_left,
+        })
+    return rows
+
+
+class ResultWriter:
+    # Streams rows to .csv or .jsonl, chosen by the file extension
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.jsonl = path.endswith(".jsonl")
+        self.csv = None if self.jsonl else csv.DictWriter(self.file, FIELDS)
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, rows):
+        if self.jsonl:
+            for row in rows:
+                self.file.write(json.dumps(row) + "\n")
+        else:
+            self.csv.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def summarize(rows, elapsed):
+    scores = sorted(row["score"] for row in rows)
+    frames = sum(row["frames"] for row in rows)
+    count = len(rows)
+    return {
+        "episodes": count,
+        "wins": sum(row["win"] for row in rows),
+        "win_rate": sum(row["win"] for row in rows) / count if count else 0.0,
+        "score_mean": statistics.fmean(scores) if scores else 0.0,
+        "score_median": statistics.median(scores) if scores else 0,
+        "score_p95": scores[min(count - 1, int(count * 0.95))] if scores else 0,
+        "score_max": scores[-1] if scores else 0,
+        "frames_mean": frames / count if count else 0.0,
+        "end_reasons": dict(Counter(row["end_reason"] for row in rows)),
+        "elapsed_s": round(elapsed, 3),
+        "episodes_per_s": count / elapsed if elapsed else 0.0,
+        "frames_per_s": frames / elapsed if elapsed else 0.0,
+    }
+
+
+def make_jobs(args, options):
+    # [(game options, jobs)]. Recordings are replayed with the options they
+    # were recorded with, so their jobs are grouped by those options.
+    if args.policy != "replay":
+        return [(options, [(i, args.seed + i, None) for i in range(args.episodes)])]
+    groups = {}
+    episode = 0
+    for path in args.replay:
+        recorded, sessions = read_replay(load_replay(path))
+        game_options = dict(options, **recorded)
+        key = json.dumps(game_options, sort_keys=True)
+        jobs = groups.setdefault(key, (game_options, []))[1]
+        for seed, inputs in sessions:
+            jobs.append((episode, seed, inputs))
+            episode += 1
+    return list(groups.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless PacMac games in parallel")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--policy", choices=("random", "seeker", "replay"), default="random")
+    parser.add_argument("--replay", nargs="*", default=[], metavar="FILE",
+                        help="recordings to re-simulate with --policy replay")
+    parser.add_argument("--max-frames", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--out", help="per-episode results (.csv or .jsonl)")
+    parser.add_argument("--summary", help="also write the summary JSON here")
+    parser.add_argument("--level", default="default", help="level name or .json file")
+    parser.add_argument("--ghost-count", type=int)
+    parser.add_argument("--ghost-speed", type=int, default=2)
+    parser.add_argument("--power-duration", type=int, default=POWER_DURATION)
+    parser.add_argument("--chase", action="store_true")
+    parser.add_argument("--swarm", action="store_true")
+    args = parser.parse_args(argv)
+    if args.policy == "replay" and not args.replay:
+        parser.error("--policy replay needs --replay FILE...")
+
+    config = {
+        "policy": args.policy,
+        "max_frames": args.max_frames,
+        "game": {"level": args.level, "ghost_count": args.ghost_count, "ghost_speed": args.ghost_speed,
+                 "power_duration": args.power_duration, "chase": args.chase,
+                 "swarm": args.swarm},
+    }
+    chunks = []
+    for game_options, jobs in make_jobs(args, config["game"]):
+        chunk_config = dict(config, game=game_options)
+        chunks += [(chunk_config, jobs[i:i + args.chunk_size]) for i in range(0, len(jobs), args.chunk_size)]
+    total = sum(len(jobs) for _, jobs in chunks)
+
+    writer = ResultWriter(args.out) if args.out else None
+    rows = []
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(run_chunk, chunk_config, jobs) for chunk_config, jobs in chunks]
+            for future in as_completed(futures):
+                chunk_rows = future.result()
+                rows.extend(chunk_rows)
+                if writer:
+                    writer.write(chunk_rows)
+                print(f"\r{len(rows)}/{total} episodes", end="", file=sys.stderr)
+    finally:
+        if writer:
+            writer.close()
+    print(file=sys.stderr)
+
+    summary = summarize(rows, time.perf_counter() - start)
+    summary["config"] = config
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
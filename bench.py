@@ -0,0 +1,214 @@
+# Benchmarks for the simulation and rendering hot paths. Each scenario plays
+# a fixed number of frames with a seeded random policy and times every phase
+# of Game.step (player, ghosts, pellets, ghost_hits), the renderer with the
+# HUD, a full redraw, Game.reset, Game.snapshot and Game.restore (the last
+# four per call, the rest per frame).
+# Each scenario keeps its fastest of --repeat runs. Results are written as
+# JSON so runs from different commits can be compared:
+#
+#   python bench.py --out before.json
+#   python bench.py --out after.json --compare before.json
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import pygame
+
+import headless
+from game import SCREEN_WIDTH, SCREEN_HEIGHT
+from hud import Hud
+from levels import Level, compile_level, load_level
+from mazegen import generate_level
+from render import Renderer
+
+
+def dense_level(spacing=5):
+    # The default maze with a finer pellet lattice
+    data = load_level("default").to_dict()
+    data["name"] = f"default-dense-{spacing}"
+    data["navigation"] = dict(data["pellets"])
+    data["pellets"]["spacing"] = spacing
+    return compile_level(Level.from_dict(data))
+
+
+def maze_level(size):
+    return lambda: compile_level(generate_level(size, size, seed=size))
+
+
+# name: (Game options, frames to play); a callable option value is called
+# when the scenario runs
+SCENARIOS = {
+    "default": ({}, 3000),
+    "ghosts_100": ({"ghost_count": 100}, 1000),
+    "ghosts_1000": ({"ghost_count": 1000}, 200),
+    "swarm_1000": ({"ghost_count": 1000, "swarm": True}, 1000),
+    "chase_100": ({"ghost_count": 100, "chase": True}, 1000),
+    "dense_pellets": ({"level": dense_level}, 3000),
+    "maze_50": ({"level": maze_level(50), "ghost_count": 100}, 1000),
+    "maze_200": ({"level": maze_level(200), "ghost_count": 1000}, 200),
+}
+
+RESETS = 20
+
+
+class PhaseTimer:
+    # Accumulates the time between consecutive mark() calls per phase
+    def __init__(self):
+        self.totals = {}
+        self.last = time.perf_counter()
+
+    def start(self):
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+def run_scenario(options, frames, seed=0, draw=True):
+    options = {name: value() if callable(value) else value for name, value in options.items()}
+    game = headless.make_game(seed, **options)
+    rng = random.Random(seed)
+    policy = headless.random_policy(rng)
+    renderer = None
+    if draw:
+        screen = pygame.display.get_surface() or pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        renderer = Renderer(screen, Hud())
+        renderer.draw(game)
+
+    timer = PhaseTimer()
+    played = 0
+    start = time.perf_counter()
+    while played < frames:
+        if game.done:
+            game.reset(rng.getrandbits(63))
+            if renderer:
+                renderer.draw(game)
+        action = policy(game)
+        timer.start()
+        game.step(action, timer)
+        if renderer:
+            renderer.draw(game)
+            timer.mark("draw")
+        played += 1
+    elapsed = time.perf_counter() - start
+
+    # Whole-screen redraw, as after a reset or window expose
+    if renderer:
+        timer.start()
+        for _ in range(RESETS):
+            renderer.attach(game)
+            renderer.draw(game)
+        timer.totals["draw_full"] = (time.perf_counter() - timer.last) * frames / RESETS
+
+    timer.start()
+    for _ in range(RESETS):
+        snapshot = game.snapshot()
+    timer.totals["snapshot"] = (time.perf_counter() - timer.last) * frames / RESETS
+    timer.start()
+    for _ in range(RESETS):
+        game.restore(snapshot)
+    timer.totals["restore"] = (time.perf_counter() - timer.last) * frames / RESETS
+
+    timer.start()
+    for _ in range(RESETS):
+        game.reset(rng.getrandbits(63))
+    timer.totals["reset"] = (time.perf_counter() - timer.last) * frames / RESETS
+
+    phases = {name: round(total / frames * 1e6, 2) for name, total in timer.totals.items()}
+    return {
+        "frames": frames,
+        "fps": round(frames / elapsed, 1),
+        "frame_us": round(elapsed / frames * 1e6, 2),
+        "phases_us": phases,
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # Print fps changes against a previous run; returns the regressed scenarios
+    regressed = []
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        change = result["fps"] / before["fps"] - 1
+        flag = ""
+        if change < -threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:16} {before['fps']:>10.1f} -> {result['fps']:>10.1f} fps  {change:+.1%}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PacMac simulation and renderer")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help="scenarios to run (default: all): " + ", ".join(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every frame count")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario, fastest kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-draw", action="store_true", help="skip the renderer phases")
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fps drop that counts as a regression (default 0.15)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {unknown[0]!r}")
+
+    results = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "scale": args.scale,
+        "scenarios": {},
+    }
+    for name in args.scenarios or SCENARIOS:
+        options, frames = SCENARIOS[name]
+        frames = max(1, int(frames * args.scale))
+        runs = [run_scenario(options, frames, args.seed, not args.no_draw) for _ in range(args.repeat)]
+        result = max(runs, key=lambda run: run["fps"])
+        results["scenarios"][name] = result
+        phases = "  ".join(f"{phase} {us:.1f}" for phase, us in result["phases_us"].items())
+        print(f"{name:16} {result['fps']:>10.1f} fps  (us/frame: {phases})", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
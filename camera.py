@@ -0,0 +1,22 @@
+# Scrolling camera: a screen-sized view onto the level that keeps the player
+# centred, clamped so it never shows past the level edges. A level smaller
+# than the view stays centred in it.
+import pygame
+
+
+class Camera:
+    def __init__(self, view_size, level_size):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.bounds = pygame.Rect((0, 0), level_size)
+        self.rect.clamp_ip(self.bounds)
+
+    @property
+    def offset(self):
+        return self.rect.topleft
+
+    def follow(self, target):
+        # Centre on target (a rect); returns True if the view moved
+        old = self.rect.topleft
+        self.rect.center = target.center
+        self.rect.clamp_ip(self.bounds)
+        return self.rect.topleft != old
@@ -0,0 +1,637 @@
+import os
+import random
+import struct
+import sys
+
+import pygame
+
+from levels import GHOST_SIZE, compile_level, load_level
+from navigation import DIRECTIONS, DIRECTION_INDEX, EXIT_DIRECTIONS, FlowField, probe_exits
+
+# Check if running in browser
+IS_WEB = sys.platform == "emscripten"
+
+# Asset location (relative paths are used by the web build)
+BASE_DIR = "" if IS_WEB else os.path.dirname(os.path.abspath(__file__))
+
+# Screen dimensions
+SCREEN_WIDTH = 420
+SCREEN_HEIGHT = 360
+
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 0)
+
+
+# Pac-Man animation frames, rendered once per size into a shared atlas
+PACMAN_DIRECTIONS = ("right", "left", "up", "down")
+_pacman_atlases = {}
+
+
+def pacman_frames(size):
+    frames = _pacman_atlases.get(size)
+    if frames is not None:
+        return frames
+
+    # One row per direction, closed mouth in the first column, open in the second
+    atlas = pygame.Surface((size * 2, size * len(PACMAN_DIRECTIONS)), pygame.SRCALPHA)
+    center = (size // 2, size // 2)
+    radius = size // 2
+    wedges = {
+        "left": [center, (0, 0), (0, size)],
+        "up": [center, (0, 0), (size, 0)],
+        "down": [center, (0, size), (size, size)],
+        "right": [center, (size, 0), (size, size)],
+    }
+    frames = {}
+    for row, direction in enumerate(PACMAN_DIRECTIONS):
+        for col, mouth_open in enumerate((False, True)):
+            frame = atlas.subsurface((col * size, row * size, size, size))
+            pygame.draw.circle(frame, YELLOW, center, radius)
+            if mouth_open:
+                # Cut out a triangular wedge for the mouth
+                pygame.draw.polygon(frame, (0, 0, 0, 0), wedges[direction])
+            frames[(direction, mouth_open)] = frame
+    _pacman_atlases[size] = frames
+    return frames
+
+
+class Player(pygame.sprite.DirtySprite):
+    def __init__(self, x, y):
+        super().__init__()
+        self.size = 20
+        self.rect = pygame.Rect(0, 0, self.size, self.size)
+        self.rect.topleft = (x, y)
+        self.change_x = 0
+        self.change_y = 0
+        self.last_dir = "right"
+        self.mouth_open = True
+        self.mouth_timer = 0
+        self.mouth_interval = 10
+        self.frames = pacman_frames(self.size)
+        self._draw_pacman()
+
+    def changespeed(self, x, y):
+        self.change_x = x
+        self.change_y = y
+        if x < 0:
+            self.last_dir = "left"
+        elif x > 0:
+            self.last_dir = "right"
+        elif y < 0:
+            self.last_dir = "up"
+        elif y > 0:
+            self.last_dir = "down"
+
+    def update(self, walls):
+        # walls is a SpatialGrid of Wall sprites
+        old_pos = self.rect.topleft
+        self.rect.x += self.change_x
+        block_hit_list = walls.collide(self.rect)
+        for block in block_hit_list:
+            if self.change_x > 0:
+                self.rect.right = block.rect.left
+            else:
+                self.rect.left = block.rect.right
+
+        self.rect.y += self.change_y
+        block_hit_list = walls.collide(self.rect)
+        for block in block_hit_list:
+            if self.change_y > 0:
+                self.rect.bottom = block.rect.top
+            else:
+                self.rect.top = block.rect.bottom
+
+        # Animate mouth open/close
+        self.mouth_timer += 1
+        if self.mouth_timer >= self.mouth_interval:
+            self.mouth_open = not self.mouth_open
+            self.mouth_timer = 0
+            self._draw_pacman()
+        elif self.rect.topleft != old_pos:
+            self.dirty = 1
+
+    def _draw_pacman(self):
+        self.image = self.frames[(self.last_dir, self.mouth_open)]
+        self.dirty = 1
+
+
+class Wall(pygame.sprite.DirtySprite):
+    def __init__(self, x, y, width, height):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, width, height)
+        self._image = None
+
+    @property
+    def image(self):
+        # Made on first draw, so headless games and big levels only pay for
+        # the walls that are actually drawn
+        if self._image is None:
+            self._image = pygame.Surface(self.rect.size)
+            self._image.fill(WHITE)
+        return self._image
+
+
+# Normal and frightened ghost images, built once per source image and shared
+# by every Ghost using it
+_ghost_variants = {}
+
+
+def ghost_variants(image):
+    variants = _ghost_variants.get(image)
+    if variants is None:
+        normal = image.copy()
+        edible = image.copy()
+        tint = pygame.Surface(edible.get_size(), pygame.SRCALPHA)
+        tint.fill((80, 80, 255, 200))
+        edible.blit(tint, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        # Match the display pixel format when there is one, for fast blits
+        if pygame.display.get_surface() is not None:
+            if image.get_flags() & pygame.SRCALPHA:
+                normal, edible = normal.convert_alpha(), edible.convert_alpha()
+            else:
+                normal, edible = normal.convert(), edible.convert()
+        variants = _ghost_variants[image] = (normal, edible)
+    return variants
+
+
+class Ghost(pygame.sprite.DirtySprite):
+    # With a flow_field the ghost chases the player instead of wandering
+    # (except while edible). Chasing ghosts re-decide every lattice cell.
+    # With a moves table (navigation.MoveTable) legal exits are looked up
+    # instead of probed against the walls.
+    def __init__(self, x, y, image, walls, flow_field=None, moves=None, rng=None, speed=2):
+        super().__init__()
+        # Random stream for this ghost's decisions (the game session's)
+        self.rng = rng if rng is not None else random
+        self.base_image = image
+        self.variants = ghost_variants(image)
+        self.image = self.variants[0]
+        self.rect = self.image.get_rect()
+        self.rect.topleft = (x, y)
+        self.walls = walls
+        self.speed = speed
+        self.direction = self.rng.choice(DIRECTIONS)
+        self.steps_remaining = self.rng.randint(15, 60)
+        self.edible = False
+        self.stuck_counter = 0
+        self.flow_field = flow_field
+        # Steps to cross one cell of the field's lattice at this speed
+        self.chase_steps = max(1, flow_field.graph.spacing // speed) if flow_field is not None else 0
+        self.moves = moves
+
+    def update(self):
+        # Random wandering: keep a direction for a few steps, change when blocked or timer expires
+        exits = self._exits()
+        if self.steps_remaining <= 0 or not exits & (1 << DIRECTION_INDEX[self.direction]):
+            if self.flow_field is not None and not self.edible:
+                self._choose_chase_direction(exits)
+            else:
+                self._choose_new_direction(exits)
+
+        if exits & (1 << DIRECTION_INDEX[self.direction]):
+            dx, dy = self._delta_for_direction(self.direction)
+            self.rect.x += dx
+            self.rect.y += dy
+            self.steps_remaining -= 1
+            # Only reset stuck counter if ghost actually moved
+            if dx or dy:
+                self.stuck_counter = 0
+                self.dirty = 1
+            else:
+                self.stuck_counter += 1
+        else:
+            self.steps_remaining = 0
+            self.stuck_counter += 1
+
+        if self.stuck_counter > 60:
+            self._teleport_to_free_spot()
+            self.stuck_counter = 0
+            self.dirty = 1
+
+    def set_edible(self, edible=True):
+        self.edible = edible
+        self.image = self.variants[1 if edible else 0]
+        self.dirty = 1
+
+    def _delta_for_direction(self, direction):
+        if direction == "left":
+            return -self.speed, 0
+        if direction == "right":
+            return self.speed, 0
+        if direction == "up":
+            return 0, -self.speed
+        return 0, self.speed  # down
+
+    def _exits(self):
+        # Bitmask of the directions the ghost can step in from here
+        if self.moves is not None:
+            return self.moves.exits_at(self.rect.x, self.rect.y)
+        return probe_exits(self.walls, self.rect, self.speed)
+
+    def _can_move(self, direction):
+        return bool(self._exits() & (1 << DIRECTION_INDEX[direction]))
+
+    def _choose_new_direction(self, exits=None):
+        options = EXIT_DIRECTIONS[self._exits() if exits is None else exits]
+        if options:
+            self.direction = self.rng.choice(options)
+            self.steps_remaining = self.rng.randint(15, 60)
+        else:
+            self.steps_remaining = 0
+
+    def _choose_chase_direction(self, exits):
+        # Step towards the player along the shared flow field, else wander
+        field = self.flow_field
+        closer = field.direction(field.graph.node_at(*self.rect.center), exits)
+        options = EXIT_DIRECTIONS[closer]
+        if options:
+            self.direction = self.rng.choice(options)
+            self.steps_remaining = self.chase_steps
+        else:
+            self._choose_new_direction(exits)
+
+    def _teleport_to_free_spot(self):
+        # If a ghost is stuck too long, relocate it to a random free spot
+        # reachable in the maze, or, on a level without any, the free
+        # position closest to it. Without a moves table it stays put.
+        if self.moves is None:
+            return
+        spot = self.moves.random_spot(self.rng) or self.moves.nearest_spot(self.rect.topleft)
+        if spot is not None:
+            self.rect.topleft = spot
+
+
+# Player inputs accepted by Game.step (None keeps the current velocity)
+STOP, LEFT, RIGHT, UP, DOWN = range(5)
+ACTIONS = (STOP, LEFT, RIGHT, UP, DOWN)
+PLAYER_SPEED = 3
+ACTION_VELOCITY = {
+    STOP: (0, 0),
+    LEFT: (-PLAYER_SPEED, 0),
+    RIGHT: (PLAYER_SPEED, 0),
+    UP: (0, -PLAYER_SPEED),
+    DOWN: (0, PLAYER_SPEED),
+}
+
+
+def velocity_action(change_x, change_y):
+    # The action matching a player velocity (input handling only ever sets one axis)
+    if change_x < 0:
+        return LEFT
+    if change_x > 0:
+        return RIGHT
+    if change_y < 0:
+        return UP
+    if change_y > 0:
+        return DOWN
+    return STOP
+
+
+# Simulation ticks per second; speeds and timers all count in ticks, and the
+# interactive loop steps the game at this rate whatever the display does
+TICK_RATE = 60
+
+# Power mode lasts 10 seconds (600 frames at 60 fps)
+POWER_DURATION = 600
+
+# Game.snapshot() layout: header, session RNG, player, one record per ghost
+# sprite in spawn order, pellet cells, power pellet cells, then the swarm's
+# own snapshot. The header ends with the ghost and lattice sizes, which a
+# restoring game must match.
+SNAPSHOT_HEADER = struct.Struct("<qIiiiBBBBII")
+RNG_STATE = struct.Struct("<625I?d")
+PLAYER_STATE = struct.Struct("<iiiiBBi")
+GHOST_STATE = struct.Struct("<iiBiBiB")
+END_REASONS = (None, "caught", "pellets", "ghosts")
+
+
+def load_ghost_images():
+    ghost_images = []
+    for img_name in ["ghl.png", "kajabi.png", "sk.png", "sys.png"]:
+        try:
+            img_path = os.path.join(BASE_DIR, "imgs", img_name) if not IS_WEB else f"imgs/{img_name}"
+            image = pygame.image.load(img_path)
+            image = pygame.transform.scale(image, GHOST_SIZE)
+            ghost_images.append(image)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading image {img_name}: {e}, using placeholder")
+            # Create colored placeholder for each ghost
+            placeholder = pygame.Surface(GHOST_SIZE)
+            colors = [(255, 0, 0), (255, 184, 255), (0, 255, 255), (255, 184, 82)]
+            placeholder.fill(colors[len(ghost_images) % len(colors)])
+            ghost_images.append(placeholder)
+    return ghost_images
+
+
+class Game:
+    # One game session: sprites, score and power mode, advanced one frame per step()
+
+    # ghost_count defaults to one ghost per image. With swarm=True the ghosts
+    # run in the NumPy GhostSwarm engine instead of as Ghost sprites. With
+    # chase=True ghost sprites hunt the player through a shared flow field.
+    # ghost_speed and power_duration are balance knobs (pixels and frames).
+    # level is a levels.Level (compiled on first use) or a level name.
+    def __init__(self, ghost_images=None, seed=None, ghost_count=None, swarm=False, chase=False,
+                 ghost_speed=2, power_duration=POWER_DURATION, level=None):
+        self.ghost_images = ghost_images if ghost_images is not None else load_ghost_images()
+        self.ghost_speed = ghost_speed
+        self.power_duration = power_duration
+        self.ghost_count = len(self.ghost_images) if ghost_count is None else ghost_count
+        self.use_swarm = swarm
+        self.swarm = None
+        self.chase = chase
+        self.flow_field = None
+        self.ghost_list = pygame.sprite.Group()
+        # Every ghost sprite of the session in spawn order, killed ones too
+        self.ghosts = []
+        # The name or path the level was loaded by, for recordings. It stays
+        # here: the compiled Level is shared by every game with that content.
+        self.level_source = None
+        if level is None or isinstance(level, str):
+            self.level_source = level or "default"
+            level = load_level(self.level_source)
+        elif level.graph is None:
+            level = compile_level(level)
+        self.level = level
+        # Walls never change, so they are made once per game rather than per
+        # reset; the compiled level already knows which index cells they cover
+        self.wall_index = level.wall_index([Wall(*item) for item in level.walls])
+        # Pellets and power pellets share the level's lattice
+        self.pellets = self.level.pellet_grid()
+        self.power_pellets = self.level.pellet_grid(power=True)
+        if swarm:
+            # Made once; reset() refills its arrays
+            from swarm import GhostSwarm
+            moves = level.move_table(self.ghost_images[0].get_size(), ghost_speed)
+            self.swarm = GhostSwarm(moves, level.ghost_spawns, self.ghost_count)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Every session draws from its own RNG; without a seed a fresh one is
+        # picked and kept in self.seed so the session can be replayed
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.ghost_list.empty()
+        level = self.level
+
+        # Pellets (none inside walls) and power pellets come precomputed
+        self.pellets.load(level.pellet_cells)
+        self.power_pellets.load(level.power_cells)
+
+        # Create player
+        self.player = Player(*level.player)
+
+        # Create ghosts
+        if self.chase:
+            self.flow_field = FlowField(self.maze)
+            self.flow_field.set_target(self.maze.node_at(*self.player.rect.center))
+        ghost_spawns = level.ghost_spawns
+        if self.swarm is not None:
+            self.swarm.reset(self.rng.getrandbits(64))
+        ghost_moves = None
+        if not self.use_swarm and self.ghost_count:
+            ghost_moves = level.move_table(self.ghost_images[0].get_size(), self.ghost_speed)
+        for i in range(0 if self.use_swarm else self.ghost_count):
+            ghost_image = self.ghost_images[i % len(self.ghost_images)]
+            x, y = ghost_spawns[i % len(ghost_spawns)]
+            if ghost_moves is not None:
+                # Spawn points overlapping a wall move to the closest free spot
+                x, y = ghost_moves.nearest_spot((x, y)) or (x, y)
+            ghost = Ghost(x, y, ghost_image, self.wall_index, self.flow_field, ghost_moves, self.rng,
+                          self.ghost_speed)
+            ghost.set_edible(False)
+            self.ghost_list.add(ghost)
+        self.ghosts = self.ghost_list.sprites()
+
+        self.score = 0
+        self.ghost_edible = False
+        self.power_timer = 0
+        self.game_over = False
+        self.win = False
+        # Why the game ended: "caught", "pellets" or "ghosts"
+        self.end_reason = None
+        self.frame = 0
+        return self.state()
+
+    @property
+    def done(self):
+        return self.game_over or self.win
+
+    @property
+    def maze(self):
+        # Navigation graph for the level, compiled with it
+        return self.level.graph
+
+    @property
+    def ghosts_left(self):
+        if self.swarm is not None:
+            return len(self.swarm)
+        return len(self.ghost_list)
+
+    def _set_ghosts_edible(self, edible):
+        if self.swarm is not None:
+            self.swarm.set_edible(edible)
+        else:
+            for ghost in self.ghost_list:
+                ghost.set_edible(edible)
+
+    def _ghost_hits(self):
+        if self.swarm is not None:
+            return self.swarm.collide(self.player.rect)
+        return pygame.sprite.spritecollide(self.player, self.ghost_list, False)
+
+    def _kill_ghosts(self, hits):
+        if self.swarm is not None:
+            self.swarm.kill(hits)
+        else:
+            for ghost in hits:
+                ghost.kill()
+
+    def step(self, action=None, profiler=None):
+        # Advance one frame; returns (score gained, done). A profiler's
+        # mark(phase) is called after each phase of the frame.
+        if self.done:
+            return 0, True
+        if action is not None:
+            self.player.changespeed(*ACTION_VELOCITY[action])
+
+        score_before = self.score
+        self.frame += 1
+
+        self._update_player()
+        if profiler is not None:
+            profiler.mark("player")
+        self._update_ghosts()
+        if profiler is not None:
+            profiler.mark("ghosts")
+        self._eat_pellets()
+        if profiler is not None:
+            profiler.mark("pellets")
+        self._check_ghosts()
+        if profiler is not None:
+            profiler.mark("ghost_hits")
+
+        return self.score - score_before, self.done
+
+    def _update_player(self):
+        self.player.update(self.wall_index)
+        if self.flow_field is not None:
+            self.flow_field.set_target(self.maze.node_at(*self.player.rect.center))
+
+    def _update_ghosts(self):
+        if self.swarm is not None:
+            self.swarm.update()
+        else:
+            self.ghost_list.update()
+
+    def _eat_pellets(self):
+        player = self.player
+        self.score += self.pellets.eat(player.rect)
+
+        # Check for power pellet collision
+        power_eaten = self.power_pellets.eat(player.rect)
+        if power_eaten:
+            self.score += 5 * power_eaten
+            self.ghost_edible = True
+            self.power_timer = self.power_duration
+            self._set_ghosts_edible(True)
+
+        # Handle power timer countdown
+        if self.ghost_edible and self.power_timer > 0:
+            self.power_timer -= 1
+            if self.power_timer == 0:
+                self.ghost_edible = False
+                self._set_ghosts_edible(False)
+
+    def _check_ghosts(self):
+        ghost_hit_list = self._ghost_hits()
+        if len(ghost_hit_list):
+            if self.ghost_edible:
+                self._kill_ghosts(ghost_hit_list)
+                self.score += 10 * len(ghost_hit_list)
+                # Check if all ghosts are eliminated
+                if self.ghosts_left == 0:
+                    self.win = True
+            else:
+                self.game_over = True
+                self.end_reason = "caught"
+
+        # Win condition: collect all pellets OR eliminate all ghosts
+        if (self.pellets.count == 0 and self.power_pellets.count == 0) or self.ghosts_left == 0:
+            self.win = True
+        if self.win and self.end_reason is None:
+            self.end_reason = "ghosts" if self.ghosts_left == 0 else "pellets"
+
+    def snapshot(self):
+        # The session's mutable state as bytes, for restore(). Walls, images
+        # and the level are not included: restore into a Game made with the
+        # same level and ghost options.
+        player = self.player
+        target = self.flow_field.target if self.flow_field is not None else None
+        _, rng_state, gauss = self.rng.getstate()
+        parts = [
+            SNAPSHOT_HEADER.pack(self.seed, self.frame, self.score, self.power_timer,
+                                 -1 if target is None else target, self.ghost_edible, self.game_over,
+                                 self.win, END_REASONS.index(self.end_reason), len(self.ghosts),
+                                 len(self.pellets.cells)),
+            RNG_STATE.pack(*rng_state, gauss is not None, gauss or 0.0),
+            PLAYER_STATE.pack(player.rect.x, player.rect.y, player.change_x, player.change_y,
+                              DIRECTION_INDEX[player.last_dir], player.mouth_open, player.mouth_timer),
+        ]
+        parts += [GHOST_STATE.pack(g.rect.x, g.rect.y, DIRECTION_INDEX[g.direction], g.steps_remaining,
+                                   g.edible, g.stuck_counter, g.alive()) for g in self.ghosts]
+        parts += [self.pellets.cells, self.power_pellets.cells]
+        if self.swarm is not None:
+            parts.append(self.swarm.snapshot())
+        return b"".join(parts)
+
+    def restore(self, data):
+        # Put the session back to a snapshot() in place, without creating
+        # sprites or touching the level. Pellets and killed ghosts can come
+        # back, so a renderer showing the game has to attach() it again.
+        (seed, frame, score, power_timer, target, ghost_edible, game_over, win, end_reason,
+         ghost_count, cell_count) = SNAPSHOT_HEADER.unpack_from(data)
+        if ghost_count != len(self.ghosts) or cell_count != len(self.pellets.cells):
+            raise ValueError("Snapshot is from a different level or ghost setup")
+        data = memoryview(data)
+        offset = SNAPSHOT_HEADER.size
+
+        rng_state = RNG_STATE.unpack_from(data, offset)
+        self.rng.setstate((3, rng_state[:625], rng_state[626] if rng_state[625] else None))
+        offset += RNG_STATE.size
+
+        x, y, change_x, change_y, last_dir, mouth_open, mouth_timer = PLAYER_STATE.unpack_from(data, offset)
+        player = self.player
+        player.rect.topleft = (x, y)
+        player.change_x = change_x
+        player.change_y = change_y
+        player.last_dir = DIRECTIONS[last_dir]
+        player.mouth_open = bool(mouth_open)
+        player.mouth_timer = mouth_timer
+        player._draw_pacman()
+        offset += PLAYER_STATE.size
+
+        end = offset + ghost_count * GHOST_STATE.size
+        alive = []
+        for ghost, (x, y, direction, steps, edible, stuck, live) in zip(
+                self.ghosts, GHOST_STATE.iter_unpack(data[offset:end])):
+            ghost.rect.topleft = (x, y)
+            ghost.direction = DIRECTIONS[direction]
+            ghost.steps_remaining = steps
+            ghost.stuck_counter = stuck
+            ghost.set_edible(bool(edible))
+            if live:
+                alive.append(ghost)
+        # Ghosts update in group order and share the RNG, so revived ghosts
+        # have to go back in their spawn order
+        if alive != self.ghost_list.sprites():
+            for ghost in self.ghosts:
+                ghost.kill()
+            self.ghost_list.add(alive)
+        offset = end
+
+        self.pellets.load(data[offset:offset + cell_count])
+        offset += cell_count
+        self.power_pellets.load(data[offset:offset + cell_count])
+        offset += cell_count
+        if self.swarm is not None:
+            self.swarm.restore(data[offset:])
+
+        if self.flow_field is not None and target >= 0:
+            self.flow_field.set_target(target)
+        self.seed = seed
+        self.frame = frame
+        self.score = score
+        self.power_timer = power_timer
+        self.ghost_edible = bool(ghost_edible)
+        self.game_over = bool(game_over)
+        self.win = bool(win)
+        self.end_reason = END_REASONS[end_reason]
+
+    def _ghost_states(self):
+        if self.swarm is not None:
+            alive, xs, ys = self.swarm.positions()
+            return [(int(x), int(y), DIRECTIONS[self.swarm.direction[i]], bool(self.swarm.edible[i]))
+                    for i, x, y in zip(alive, xs, ys)]
+        return [(g.rect.x, g.rect.y, g.direction, g.edible) for g in self.ghost_list]
+
+    def state(self):
+        return {
+            "frame": self.frame,
+            "score": self.score,
+            "player": self.player.rect.topleft,
+            "player_velocity": (self.player.change_x, self.player.change_y),
+            "ghosts": self._ghost_states(),
+            "pellets": self.pellets.count,
+            "power_pellets": self.power_pellets.count,
+            "ghost_edible": self.ghost_edible,
+            "power_timer": self.power_timer,
+            "game_over": self.game_over,
+            "win": self.win,
+            "end_reason": self.end_reason,
+        }
@@ -0,0 +1,125 @@
+# Display-free simulation: runs Game at full CPU speed with no window,
+# no display.flip() and no clock throttling.
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import random
+import time
+from collections import deque
+
+import pygame
+
+from game import Game, ACTIONS, ACTION_VELOCITY, STOP, LEFT, RIGHT, UP, DOWN, load_ghost_images
+
+pygame.init()
+
+_ghost_images = None
+
+
+def make_game(seed=None, **options):
+    # Ghost images are loaded once per process and shared by every session.
+    # options are passed on to Game (ghost_count, swarm, chase, level, ...).
+    global _ghost_images
+    if _ghost_images is None:
+        _ghost_images = load_ghost_images()
+    return Game(_ghost_images, seed=seed, **options)
+
+
+def random_policy(rng):
+    # Hold a random direction for a few frames at a time
+    state = {"action": rng.choice(ACTIONS), "left": 0}
+
+    def policy(game):
+        if state["left"] <= 0:
+            state["action"] = rng.choice(ACTIONS[1:])
+            state["left"] = rng.randint(5, 30)
+        state["left"] -= 1
+        return state["action"]
+
+    return policy
+
+
+def pellet_seeker_policy():
+    # Scripted bot: head for the nearest remaining pellet along the maze
+    # graph, sliding towards the lattice line when a wall corner blocks it
+    moves = (LEFT, RIGHT, UP, DOWN)
+
+    def nearest_pellet_direction(game, start):
+        maze = game.maze
+        grids = (game.pellets, game.power_pellets)
+        first = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node != start:
+                index = grids[0].index(*maze.position(node))
+                if any(grid.cells[index] for grid in grids):
+                    return first[node]
+            for d in range(4):
+                if maze.exits[node] & (1 << d):
+                    nxt = maze.neighbour(node, d)
+                    if nxt not in first:
+                        first[nxt] = d if node == start else first[node]
+                        queue.append(nxt)
+        return None
+
+    # The route only changes when the player reaches another node or a pellet is eaten
+    plan = {"key": None, "direction": None}
+
+    def policy(game):
+        cx, cy = game.player.rect.center
+        node = game.maze.node_at(cx, cy)
+        if node is None:
+            return STOP
+        key = (node, game.pellets.count, game.power_pellets.count)
+        if key != plan["key"]:
+            plan["key"] = key
+            plan["direction"] = nearest_pellet_direction(game, node)
+        direction = plan["direction"]
+        if direction is None:
+            return STOP
+        action = moves[direction]
+        player = game.player
+        if game.wall_index.any(player.rect.move(ACTION_VELOCITY[action])) is None:
+            return action
+        nx, ny = game.maze.position(node)
+        if direction < 2:
+            return UP if cy > ny else DOWN
+        return LEFT if cx > nx else RIGHT
+
+    return policy
+
+
+def run_episode(seed, policy=None, max_frames=10000, game=None):
+    if game is None:
+        game = make_game(seed)
+    else:
+        game.reset(seed)
+    if policy is None:
+        policy = random_policy(random.Random(seed))
+    while not game.done and game.frame < max_frames:
+        game.step(policy(game))
+    return game.state()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless PacMac games")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-frames", type=int, default=10000)
+    parser.add_argument("--level", default="default", help="level name or .json file")
+    args = parser.parse_args()
+
+    game = make_game(args.seed, level=args.level)
+    frames = 0
+    start = time.perf_counter()
+    for i in range(args.games):
+        state = run_episode(args.seed + i, max_frames=args.max_frames, game=game)
+        frames += state["frame"]
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games, {frames} frames in {elapsed:.2f}s "
+          f"({args.games / elapsed:.1f} games/s, {frames / elapsed:.0f} frames/s)")
@@ -0,0 +1,57 @@
+# Score and end-of-game text. Fonts are loaded once and rendered strings are
+# cached, so a frame only re-renders the score when it actually changed.
+import pygame
+
+from game import SCREEN_WIDTH, SCREEN_HEIGHT, BLACK, WHITE
+
+
+class Hud:
+    def __init__(self):
+        self.fonts = {}
+        self.texts = {}
+        self.score = None
+        self.score_text = None
+        self.score_bg = pygame.Surface((140, 35))
+        self.score_bg.fill(BLACK)
+        self.score_rect = self.score_bg.get_rect(topleft=(5, 5))
+        self.banner_rect = pygame.Rect(0, 0, 0, 0)
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def text(self, message, size, color=WHITE):
+        key = (message, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.texts[key] = self.font(size).render(message, 1, color)
+        return surface
+
+    def score_surface(self, score):
+        if score != self.score:
+            self.score = score
+            self.score_text = self.font(28).render("Score: " + str(score), 1, WHITE)
+        return self.score_text
+
+    def draw(self, screen, game):
+        # Returns the screen areas drawn to
+        # Draw score at top with background
+        screen.blit(self.score_bg, self.score_rect)
+        screen.blit(self.score_surface(game.score), (10, 10))
+        rects = [self.score_rect]
+
+        if game.game_over:
+            rects.append(self._draw_banner(screen, "Game Over"))
+        if game.win:
+            rects.append(self._draw_banner(screen, "You Win!"))
+        return rects
+
+    def _draw_banner(self, screen, message):
+        text = self.text(message, 60)
+        title_rect = screen.blit(text, text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)))
+        text = self.text("Press 'r' to restart", 24)
+        hint_rect = screen.blit(text, text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 45)))
+        self.banner_rect = title_rect.union(hint_rect)
+        return self.banner_rect
@@ -0,0 +1,237 @@
+# Level files.
+#
+# A level is a JSON file in levels/ giving the maze size, its walls as
+# [x, y, width, height] rects, the pellet lattice, power pellet spots, the
+# player spawn and the ghost spawns (see levels/default.json). Pellets go on
+# every lattice point whose pellet would not touch a wall. The navigation
+# graph uses the pellet lattice unless "navigation" gives another
+# {"origin", "spacing"}.
+#
+# On first load a level is compiled: the collision grid (which walls fall in
+# each spatial-index cell), the initial pellet and power pellet grids, the
+# navigation graph and the free-position table for ghosts. The compiled form
+# is cached in .cache/ under a hash of the level, so later starts just load
+# it. Cache files are plain tables behind a struct header, never pickles.
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+import pygame
+
+from navigation import (GRAPH_FORMAT, FreeTable, MazeGraph, MoveTable, int_array, pack_blobs,
+                        reachable_spots, read_header, unpack_blobs)
+from pellets import PelletGrid
+from spatial import SpatialGrid
+
+# Compiled levels go here
+CACHE_DIR = os.environ.get("PACMAC_CACHE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache")
+# Relative on the web build, like the image assets
+LEVEL_DIR = "levels" if sys.platform == "emscripten" else os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "levels")
+# Bump when the compiled layout changes so stale cache files are ignored
+LEVEL_FORMAT = 3
+# Compiled level file: magic and LEVEL_FORMAT, then the tables as blobs
+LEVEL_MAGIC = b"PMLV"
+LEVEL_HEADER = struct.Struct("<4sI")
+# Cell size of the wall spatial index
+COLLISION_CELL = 40
+# Pellet sprite sizes (the lattice is per level, the sizes are not)
+PELLET_SIZE = 5
+POWER_PELLET_SIZE = 12
+# Ghost images are scaled to this; their free-position table is compiled in
+GHOST_SIZE = (24, 24)
+
+_levels = {}
+
+
+class _Wall:
+    # Stand-in with a rect and the wall's index, for bucketing walls
+    __slots__ = ("rect", "index")
+
+    def __init__(self, rect, index):
+        self.rect = rect
+        self.index = index
+
+
+class Level:
+    def __init__(self, name, size, walls, pellets, power_pellets, player, ghost_spawns,
+                 navigation=None):
+        self.name = name
+        self.width, self.height = size
+        self.walls = [list(w) for w in walls]
+        self.pellet_origin = pellets["origin"]
+        self.pellet_spacing = pellets["spacing"]
+        self.power_positions = [tuple(p) for p in power_pellets]
+        self.player = tuple(player)
+        self.ghost_spawns = [tuple(p) for p in ghost_spawns]
+        self.navigation = dict(navigation) if navigation else None
+        origin = self.pellet_origin
+        self.cols = len(range(origin, self.width - origin, self.pellet_spacing))
+        self.rows = len(range(origin, self.height - origin, self.pellet_spacing))
+
+        # Filled in by compile() or loaded from the cache
+        self.collision = None
+        self.pellet_cells = None
+        self.power_cells = None
+        self.graph = None
+        self.ghost_free = None
+        self.ghost_spots = None
+        # {(size, speed): MoveTable}, built on first use in this process
+        self.move_tables = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("name", "level"), data["size"], data["walls"], data["pellets"],
+                   data.get("power_pellets", []), data["player"], data["ghost_spawns"],
+                   data.get("navigation"))
+
+    def to_dict(self):
+        data = {
+            "name": self.name,
+            "size": [self.width, self.height],
+            "walls": self.walls,
+            "pellets": {"origin": self.pellet_origin, "spacing": self.pellet_spacing},
+            "power_pellets": [list(p) for p in self.power_positions],
+            "player": list(self.player),
+            "ghost_spawns": [list(p) for p in self.ghost_spawns],
+        }
+        if self.navigation:
+            data["navigation"] = dict(self.navigation)
+        return data
+
+    def key(self):
+        data = json.dumps([LEVEL_FORMAT, GRAPH_FORMAT, self.to_dict()], sort_keys=True)
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def pellet_grid(self, power=False):
+        origin = (self.pellet_origin, self.pellet_origin)
+        if power:
+            # Red color for cherry/power pellet
+            return PelletGrid(origin, self.pellet_spacing, self.cols, self.rows, POWER_PELLET_SIZE,
+                              (255, 0, 0))
+        return PelletGrid(origin, self.pellet_spacing, self.cols, self.rows, PELLET_SIZE,
+                          (255, 255, 255))
+
+    def compile(self):
+        boxes = [_Wall(pygame.Rect(w), i) for i, w in enumerate(self.walls)]
+        index = SpatialGrid(boxes, COLLISION_CELL)
+        self.collision = {cell: [box.index for box in boxes] for cell, boxes in index.cells.items()}
+
+        # Start with every lattice point and knock out the ones each wall covers
+        pellets = self.pellet_grid()
+        cells = bytearray(b"\x01") * len(pellets.cells)
+        for box in boxes:
+            for i in pellets.covering(box.rect):
+                cells[i] = 0
+        self.pellet_cells = bytes(cells)
+
+        power = self.pellet_grid(power=True)
+        for px, py in self.power_positions:
+            i = power.index(px, py)
+            if i is None:
+                raise ValueError(f"Power pellet at {(px, py)} is not on the pellet lattice")
+            if not index.any(power.rect(i)):
+                power.place(i)
+        self.power_cells = bytes(power.cells)
+
+        nav = self.navigation or {"origin": self.pellet_origin, "spacing": self.pellet_spacing}
+        self.graph = MazeGraph.build(self.walls, self.width, self.height, nav["origin"], nav["spacing"])
+        self.ghost_free = FreeTable.build(self.walls, self.width, self.height, GHOST_SIZE)
+        self.ghost_spots = reachable_spots(self.ghost_free, self.graph, self.ghost_spawns)
+        return self
+
+    def wall_index(self, sprites):
+        # SpatialGrid over sprites (one per wall, in level order) from the
+        # compiled buckets, without re-bucketing every wall
+        return SpatialGrid.from_buckets(sprites, self.collision, COLLISION_CELL)
+
+    def move_table(self, size, speed):
+        # Ghost exits and free spots, shared by every game on this level
+        key = (tuple(size), speed)
+        table = self.move_tables.get(key)
+        if table is None:
+            free, spots = self.ghost_free, self.ghost_spots
+            if free.size != key[0]:
+                free = FreeTable.build(self.walls, self.width, self.height, size)
+                spots = reachable_spots(free, self.graph, self.ghost_spawns)
+            table = self.move_tables[key] = MoveTable(free, speed, spots)
+        return table
+
+    def to_bytes(self):
+        # The collision grid goes as (cx, cy, wall count) per cell plus the
+        # wall indices of all cells in the same order
+        cells = array("i")
+        walls = array("i")
+        for (cx, cy), indices in self.collision.items():
+            cells.extend((cx, cy, len(indices)))
+            walls.extend(indices)
+        return LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_FORMAT) + pack_blobs(
+            cells, walls, self.pellet_cells, self.power_cells, self.graph.to_bytes(),
+            self.ghost_free.to_bytes(), self.ghost_spots)
+
+    def load_compiled(self, data):
+        magic, version = read_header(LEVEL_HEADER, data, "compiled level")
+        if magic != LEVEL_MAGIC or version != LEVEL_FORMAT:
+            raise ValueError("Unsupported compiled level format")
+        cells, walls, pellets, power, graph, free, spots = unpack_blobs(data, LEVEL_HEADER.size, 7)
+        cells, walls = int_array(cells), int_array(walls)
+        lattice = self.cols * self.rows
+        if (len(pellets) != lattice or len(power) != lattice or sum(cells[2::3]) != len(walls)
+                or (walls and (min(walls) < 0 or max(walls) >= len(self.walls)))):
+            raise ValueError("Compiled level does not match the level")
+        collision = {}
+        start = 0
+        for k in range(0, len(cells), 3):
+            cx, cy, count = cells[k:k + 3]
+            collision[(cx, cy)] = walls[start:start + count].tolist()
+            start += count
+        self.collision = collision
+        self.pellet_cells = pellets
+        self.power_cells = power
+        self.graph = MazeGraph.from_bytes(graph)
+        self.ghost_free = FreeTable.from_bytes(free)
+        self.ghost_spots = int_array(spots)
+        return self
+
+
+def level_path(name):
+    # A level name (levels/<name>.json) or a path to a level file
+    if name.endswith(".json") or os.sep in name:
+        return name
+    return os.path.join(LEVEL_DIR, f"{name}.json")
+
+
+def compile_level(level, cache_dir=None):
+    # Compiled level: from memory, then the disk cache, then compiled
+    key = level.key()
+    cached = _levels.get(key)
+    if cached is not None:
+        return cached
+
+    path = os.path.join(cache_dir or CACHE_DIR, f"level-{key}.bin")
+    try:
+        with open(path, "rb") as f:
+            level.load_compiled(f.read())
+    except (OSError, ValueError):
+        level.compile()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(level.to_bytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write level cache {path}: {e}")
+
+    _levels[key] = level
+    return level
+
+
+def load_level(name="default", cache_dir=None):
+    with open(level_path(name)) as f:
+        level = Level.from_dict(json.load(f))
+    return compile_level(level, cache_dir)
@@ -0,0 +1,154 @@
+# Seeded maze generator for big levels and stress tests.
+#
+# The maze is a grid of cols x rows cells, each a 30 px corridor square with
+# 10 px walls between them. A randomized depth-first search carves a spanning
+# tree, so every cell is reachable, then a fraction of the remaining inner
+# walls is knocked out to add loops. Wall segments in the same row or column
+# are merged into one rect per run, so a level has far fewer walls than
+# cells. Pellets sit on cell centres and open passages; power pellets in the
+# corners; ghosts spawn at random cells away from the player.
+#
+#   python mazegen.py 50 50 --seed 1 --out levels/maze50.json
+import argparse
+import json
+import random
+
+from levels import Level
+
+CORRIDOR = 30
+WALL = 10
+PITCH = CORRIDOR + WALL
+
+
+def carve(cols, rows, rng, loops):
+    # Returns (horizontal, vertical) wall flags. horizontal[j * cols + i] is
+    # the wall above cell (i, j) (j == rows is the bottom border);
+    # vertical[j * (cols + 1) + i] is the wall left of cell (i, j).
+    horizontal = bytearray(b"\x01") * (cols * (rows + 1))
+    vertical = bytearray(b"\x01") * ((cols + 1) * rows)
+    visited = bytearray(cols * rows)
+    stack = [(0, 0)]
+    visited[0] = 1
+    while stack:
+        i, j = stack[-1]
+        options = []
+        if i > 0 and not visited[j * cols + i - 1]:
+            options.append((i - 1, j))
+        if i + 1 < cols and not visited[j * cols + i + 1]:
+            options.append((i + 1, j))
+        if j > 0 and not visited[(j - 1) * cols + i]:
+            options.append((i, j - 1))
+        if j + 1 < rows and not visited[(j + 1) * cols + i]:
+            options.append((i, j + 1))
+        if not options:
+            stack.pop()
+            continue
+        ni, nj = options[rng.randrange(len(options))]
+        if ni != i:
+            vertical[j * (cols + 1) + max(i, ni)] = 0
+        else:
+            horizontal[max(j, nj) * cols + i] = 0
+        visited[nj * cols + ni] = 1
+        stack.append((ni, nj))
+
+    # Extra openings make loops, so there is more than one way around
+    if loops:
+        for j in range(1, rows):
+            for i in range(cols):
+                if horizontal[j * cols + i] and rng.random() < loops:
+                    horizontal[j * cols + i] = 0
+        for j in range(rows):
+            for i in range(1, cols):
+                if vertical[j * (cols + 1) + i] and rng.random() < loops:
+                    vertical[j * (cols + 1) + i] = 0
+    return horizontal, vertical
+
+
+def wall_rects(cols, rows, horizontal, vertical):
+    # Each run of consecutive wall segments becomes one rect
+    rects = []
+    for j in range(rows + 1):
+        i = 0
+        while i < cols:
+            if not horizontal[j * cols + i]:
+                i += 1
+                continue
+            start = i
+            while i < cols and horizontal[j * cols + i]:
+                i += 1
+            rects.append([start * PITCH, j * PITCH, (i - start) * PITCH + WALL, WALL])
+    for i in range(cols + 1):
+        j = 0
+        while j < rows:
+            if not vertical[j * (cols + 1) + i]:
+                j += 1
+                continue
+            start = j
+            while j < rows and vertical[j * (cols + 1) + i]:
+                j += 1
+            rects.append([i * PITCH, start * PITCH, WALL, (j - start) * PITCH + WALL])
+    return rects
+
+
+def cell_center(i, j):
+    return WALL + i * PITCH + CORRIDOR // 2, WALL + j * PITCH + CORRIDOR // 2
+
+
+def generate_level(cols, rows, seed=0, loops=0.1, ghosts=4, name=None):
+    # An uncompiled Level; pass it to Game(level=...) or levels.compile_level
+    if cols < 2 or rows < 2:
+        raise ValueError("A maze needs at least 2 x 2 cells")
+    rng = random.Random(seed)
+    horizontal, vertical = carve(cols, rows, rng, loops)
+
+    # Player in the top-left cell, power pellets in the other corners
+    px, py = cell_center(0, 0)
+    corners = [(cols - 1, 0), (0, rows - 1), (cols - 1, rows - 1)]
+    power = [cell_center(i, j) for i, j in corners]
+
+    # Ghost spawns (sprite top-left) at random cells at least half the maze
+    # away, falling back to the far corners
+    cells = []
+    for _ in range(ghosts * 20):
+        i, j = rng.randrange(cols), rng.randrange(rows)
+        if i + j >= (cols + rows) // 2:
+            cells.append((i, j))
+            if len(cells) == ghosts:
+                break
+    cells += [corners[k % len(corners)] for k in range(ghosts - len(cells))]
+    spawns = [(x - 12, y - 12) for x, y in (cell_center(i, j) for i, j in cells)]
+
+    return Level(
+        name or f"maze-{cols}x{rows}-{seed}",
+        # A wall's width of room past the last wall, so the lattices (which
+        # stop short of the level edge) still reach the last row and column
+        (cols * PITCH + 2 * WALL, rows * PITCH + 2 * WALL),
+        wall_rects(cols, rows, horizontal, vertical),
+        # Half-pitch lattice: cell centres plus the passages between them
+        {"origin": WALL + CORRIDOR // 2, "spacing": PITCH // 2},
+        power,
+        (px - 10, py - 10),
+        spawns,
+        # One navigation node per cell
+        {"origin": WALL + CORRIDOR // 2, "spacing": PITCH},
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a PacMac maze level")
+    parser.add_argument("cols", type=int)
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--loops", type=float, default=0.1, help="chance to open each remaining inner wall")
+    parser.add_argument("--ghosts", type=int, default=4, help="number of ghost spawn points")
+    parser.add_argument("--out", help="level file to write (default: print)")
+    args = parser.parse_args()
+
+    level = generate_level(args.cols, args.rows, args.seed, args.loops, args.ghosts)
+    data = json.dumps(level.to_dict())
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(data)
+        print(f"{level.name}: {level.width}x{level.height} px, {len(level.walls)} walls -> {args.out}")
+    else:
+        print(data)
@@ -0,0 +1,721 @@
+# Maze navigation tables.
+#
+# The maze is sampled on the pellet lattice: each lattice point that is clear
+# of walls is a node, and neighbouring nodes are linked when the corridor
+# between them is clear. Nodes with other than two links are junctions;
+# everything else lies on a corridor between two junctions. An all-pairs
+# next-hop table over the junctions turns "which way to get from A to B"
+# into a few table lookups. Graphs are compiled and cached with their level
+# (see levels.py); the next-hop table is built on the first route query.
+import heapq
+import struct
+from array import array
+from collections import deque
+
+import pygame
+
+from spatial import SpatialGrid
+
+DIRECTIONS = ("left", "right", "up", "down")
+DIRECTION_INDEX = {name: i for i, name in enumerate(DIRECTIONS)}
+DIRECTION_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+OPPOSITE = (1, 0, 3, 2)
+NO_DIRECTION = 255
+# Direction names for each 4-bit exit mask
+EXIT_DIRECTIONS = tuple(tuple(DIRECTIONS[d] for d in range(4) if mask & (1 << d)) for mask in range(16))
+UNREACHABLE = 2 ** 31 - 1
+
+# Bump when the compiled layout changes so stale cache files are ignored
+GRAPH_FORMAT = 3
+# Compiled tables are saved as length-prefixed byte blobs behind a struct
+# header, never pickled: loading a cache file must not be able to run code
+BLOB_LENGTH = struct.Struct("<Q")
+# MazeGraph.to_bytes(): format, origin, spacing, cols, rows
+GRAPH_HEADER = struct.Struct("<Iiiii")
+# FreeTable.to_bytes(): sprite width and height, cell, cols, rows, patterns
+FREE_HEADER = struct.Struct("<iiiiiI")
+# The next-hop table has one entry per junction pair; bigger mazes route by
+# searching the graph instead
+MAX_ROUTE_JUNCTIONS = 4096
+
+
+def pack_blobs(*blobs):
+    # Each blob is bytes-like (bytes, bytearray, array)
+    blobs = [bytes(blob) for blob in blobs]
+    return b"".join(BLOB_LENGTH.pack(len(blob)) + blob for blob in blobs)
+
+
+def unpack_blobs(data, offset, count):
+    # The count blobs pack_blobs() wrote from offset on
+    blobs = []
+    for _ in range(count):
+        if offset + BLOB_LENGTH.size > len(data):
+            raise ValueError("Truncated compiled data")
+        length = BLOB_LENGTH.unpack_from(data, offset)[0]
+        offset += BLOB_LENGTH.size
+        if offset + length > len(data):
+            raise ValueError("Truncated compiled data")
+        blobs.append(data[offset:offset + length])
+        offset += length
+    if offset != len(data):
+        raise ValueError("Unexpected data after the compiled tables")
+    return blobs
+
+
+def int_array(raw, typecode="i"):
+    values = array(typecode)
+    if len(raw) % values.itemsize:
+        raise ValueError("Truncated compiled array")
+    values.frombytes(raw)
+    return values
+
+
+def read_header(header, data, what):
+    if len(data) < header.size:
+        raise ValueError(f"Truncated {what}")
+    return header.unpack_from(data)
+
+
+class _Box:
+    # Minimal sprite stand-in so wall rects can go in a SpatialGrid
+    __slots__ = ("rect",)
+
+    def __init__(self, rect):
+        self.rect = rect
+
+
+class MazeGraph:
+    def __init__(self, origin, spacing, cols, rows, exits):
+        self.origin = origin
+        self.spacing = spacing
+        self.cols = cols
+        self.rows = rows
+        # exits[node] has bit (1 << direction) set for every open neighbour
+        self.exits = exits
+        self.junctions = array("i")
+        self.junction_id = array("i", [-1]) * (cols * rows)
+        # Per node: the two junctions at the ends of its corridor, the distance
+        # to each, the first step towards each, and the direction each junction
+        # leaves by to enter the corridor. A junction is its own end at distance 0.
+        n = cols * rows
+        self.end = (array("i", [-1]) * n, array("i", [-1]) * n)
+        self.end_dist = (array("i", [0]) * n, array("i", [0]) * n)
+        self.toward = (bytearray([NO_DIRECTION]) * n, bytearray([NO_DIRECTION]) * n)
+        self.entry = (bytearray([NO_DIRECTION]) * n, bytearray([NO_DIRECTION]) * n)
+        # Corridors as flat (start junction, direction, end junction, length)
+        self.edges = array("i")
+        # Junction-to-junction distances and first steps, or None until the
+        # first route query (see has_routes)
+        self.dist = None
+        self.hop = None
+
+    @classmethod
+    def build(cls, wall_coords, width, height, origin=20, spacing=20, probe=10):
+        walls = SpatialGrid(_Box(pygame.Rect(w)) for w in wall_coords)
+        cols = len(range(origin, width - origin, spacing))
+        rows = len(range(origin, height - origin, spacing))
+        half = probe // 2
+
+        def clear(x0, y0, x1, y1):
+            return walls.any(pygame.Rect(x0 - half, y0 - half, x1 - x0 + probe, y1 - y0 + probe)) is None
+
+        open_nodes = bytearray(cols * rows)
+        for j in range(rows):
+            for i in range(cols):
+                x, y = origin + i * spacing, origin + j * spacing
+                open_nodes[j * cols + i] = clear(x, y, x, y)
+
+        # Link right and down neighbours whose connecting corridor is clear
+        exits = bytearray(cols * rows)
+        for j in range(rows):
+            for i in range(cols):
+                node = j * cols + i
+                if not open_nodes[node]:
+                    continue
+                x, y = origin + i * spacing, origin + j * spacing
+                if i + 1 < cols and open_nodes[node + 1] and clear(x, y, x + spacing, y):
+                    exits[node] |= 1 << 1
+                    exits[node + 1] |= 1 << 0
+                if j + 1 < rows and open_nodes[node + cols] and clear(x, y, x, y + spacing):
+                    exits[node] |= 1 << 3
+                    exits[node + cols] |= 1 << 2
+
+        graph = cls(origin, spacing, cols, rows, exits)
+        graph._trace_corridors(open_nodes)
+        return graph
+
+    def neighbour(self, node, direction):
+        dx, dy = DIRECTION_DELTAS[direction]
+        return node + dx + dy * self.cols
+
+    def degree(self, node):
+        return bin(self.exits[node]).count("1")
+
+    def _trace_corridors(self, open_nodes):
+        exits = self.exits
+        junction = bytearray(len(exits))
+        for node, is_open in enumerate(open_nodes):
+            if is_open and self.degree(node) != 2:
+                junction[node] = 1
+
+        seen = bytearray(len(exits))
+
+        def add_junction(node):
+            junction[node] = 1
+            self.junction_id[node] = len(self.junctions)
+            self.junctions.append(node)
+            for k in (0, 1):
+                self.end[k][node] = node
+
+        for node in range(len(exits)):
+            if junction[node]:
+                add_junction(node)
+
+        def walk(start):
+            for direction in range(4):
+                if not exits[start] & (1 << direction):
+                    continue
+                cur, heading, length, path = self.neighbour(start, direction), direction, 1, []
+                while not junction[cur]:
+                    back = OPPOSITE[heading]
+                    path.append((cur, length, back))
+                    seen[cur] = 1
+                    # Corridor nodes have exactly two exits: leave by the other one
+                    heading = next(d for d in range(4) if exits[cur] & (1 << d) and d != back)
+                    cur = self.neighbour(cur, heading)
+                    length += 1
+                for node, dist, back in path:
+                    k = 0 if self.end[0][node] < 0 else 1
+                    self.end[k][node] = start
+                    self.end_dist[k][node] = dist
+                    self.toward[k][node] = back
+                    self.entry[k][node] = direction
+                self.edges.extend((start, direction, cur, length))
+
+        for node in list(self.junctions):
+            walk(node)
+
+        # Closed loops with no junction: promote one node to a junction
+        for node in range(len(exits)):
+            if open_nodes[node] and not junction[node] and not seen[node]:
+                add_junction(node)
+                walk(node)
+
+    @property
+    def has_routes(self):
+        # Only route() and friends read the next-hop table, so it is built
+        # when they first need it rather than with every level
+        if self.hop is None:
+            self._build_routes()
+        count = len(self.junctions)
+        return len(self.hop) == count * count
+
+    def _build_routes(self):
+        count = len(self.junctions)
+        self.dist = array("i")
+        self.hop = bytearray()
+        if count > MAX_ROUTE_JUNCTIONS:
+            return
+        adjacency = [[] for _ in range(count)]
+        edges = self.edges
+        for k in range(0, len(edges), 4):
+            start, direction, end, length = edges[k:k + 4]
+            adjacency[self.junction_id[start]].append((self.junction_id[end], length, direction))
+
+        self.dist = array("i", [UNREACHABLE]) * (count * count)
+        self.hop = bytearray([NO_DIRECTION]) * (count * count)
+        for source in range(count):
+            row = source * count
+            dist = self.dist
+            hop = self.hop
+            dist[row + source] = 0
+            queue = [(0, source, NO_DIRECTION)]
+            while queue:
+                d, j, first = heapq.heappop(queue)
+                if d > dist[row + j]:
+                    continue
+                for k, length, direction in adjacency[j]:
+                    nd = d + length
+                    if nd < dist[row + k]:
+                        dist[row + k] = nd
+                        hop[row + k] = direction if j == source else first
+                        heapq.heappush(queue, (nd, k, hop[row + k]))
+
+    def node_at(self, x, y):
+        # Nearest open lattice node among the four around pixel (x, y), or None
+        fx = (x - self.origin) / self.spacing
+        fy = (y - self.origin) / self.spacing
+        i0, j0 = int(fx // 1), int(fy // 1)
+        best, best_dist = None, None
+        for i in (i0, i0 + 1):
+            for j in (j0, j0 + 1):
+                if not (0 <= i < self.cols and 0 <= j < self.rows):
+                    continue
+                node = j * self.cols + i
+                if self.end[0][node] < 0:
+                    continue
+                dist = (i - fx) ** 2 + (j - fy) ** 2
+                if best is None or dist < best_dist:
+                    best, best_dist = node, dist
+        return best
+
+    def position(self, node):
+        j, i = divmod(node, self.cols)
+        return self.origin + i * self.spacing, self.origin + j * self.spacing
+
+    def distance(self, src, dst):
+        return self._route(src, dst)[0]
+
+    def next_direction(self, src, dst):
+        # Index into DIRECTIONS of the first step on a shortest path, or None
+        # when src == dst or dst cannot be reached
+        direction = self._route(src, dst)[1]
+        return None if direction == NO_DIRECTION else direction
+
+    def route(self, src_pos, dst_pos):
+        # Direction name for the first step from pixel src_pos towards pixel
+        # dst_pos, or None if either is off the graph or they share a node
+        src = self.node_at(*src_pos)
+        dst = self.node_at(*dst_pos)
+        if src is None or dst is None:
+            return None
+        direction = self.next_direction(src, dst)
+        return None if direction is None else DIRECTIONS[direction]
+
+    def _search(self, src, dst):
+        # Breadth-first search for mazes too big for the next-hop table
+        first = {src: NO_DIRECTION}
+        frontier = [src]
+        steps = 0
+        while frontier:
+            steps += 1
+            next_frontier = []
+            for node in frontier:
+                exits = self.exits[node]
+                for d in range(4):
+                    if exits & (1 << d):
+                        nxt = self.neighbour(node, d)
+                        if nxt not in first:
+                            first[nxt] = d if node == src else first[node]
+                            if nxt == dst:
+                                return steps, first[nxt]
+                            next_frontier.append(nxt)
+            frontier = next_frontier
+        return None, NO_DIRECTION
+
+    def _route(self, src, dst):
+        if src == dst:
+            return 0, NO_DIRECTION
+        if not self.has_routes:
+            return self._search(src, dst)
+        count = len(self.junctions)
+        best, best_dir = None, NO_DIRECTION
+
+        # Both on the same corridor: walk straight along it
+        if self.junction_id[src] < 0 and self.junction_id[dst] < 0:
+            for k in (0, 1):
+                if (self.end[k][src] == self.end[k][dst] and self.entry[k][src] == self.entry[k][dst]):
+                    gap = self.end_dist[k][dst] - self.end_dist[k][src]
+                    best = abs(gap)
+                    best_dir = self.toward[k][src] if gap < 0 else self.toward[1 - k][src]
+                    break
+
+        for a in (0, 1):
+            start = self.end[a][src]
+            row = self.junction_id[start] * count
+            for b in (0, 1):
+                end = self.end[b][dst]
+                between = self.dist[row + self.junction_id[end]]
+                if between == UNREACHABLE:
+                    continue
+                cost = self.end_dist[a][src] + between + self.end_dist[b][dst]
+                if best is not None and cost >= best:
+                    continue
+                if start != src:
+                    direction = self.toward[a][src]
+                elif end != start:
+                    direction = self.hop[row + self.junction_id[end]]
+                elif end != dst:
+                    direction = self.entry[b][dst]
+                else:
+                    continue
+                best, best_dir = cost, direction
+        return best, best_dir
+
+    def to_bytes(self):
+        header = GRAPH_HEADER.pack(GRAPH_FORMAT, self.origin, self.spacing, self.cols, self.rows)
+        return header + pack_blobs(self.exits, self.junctions, self.junction_id, *self.end,
+                                   *self.end_dist, *self.toward, *self.entry, self.edges)
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, origin, spacing, cols, rows = read_header(GRAPH_HEADER, data, "maze graph")
+        if version != GRAPH_FORMAT:
+            raise ValueError("Unsupported maze graph format")
+        (exits, junctions, junction_id, end0, end1, end_dist0, end_dist1, toward0, toward1,
+         entry0, entry1, edges) = unpack_blobs(data, GRAPH_HEADER.size, 12)
+        n = cols * rows
+        per_node = (exits, toward0, toward1, entry0, entry1)
+        if any(len(raw) != n for raw in per_node):
+            raise ValueError("Maze graph tables do not match its grid")
+        graph = cls(origin, spacing, cols, rows, bytearray(exits))
+        graph.junctions = int_array(junctions)
+        graph.junction_id = int_array(junction_id)
+        graph.end = (int_array(end0), int_array(end1))
+        graph.end_dist = (int_array(end_dist0), int_array(end_dist1))
+        graph.toward = (bytearray(toward0), bytearray(toward1))
+        graph.entry = (bytearray(entry0), bytearray(entry1))
+        graph.edges = int_array(edges)
+        return graph
+
+
+def probe_exits(walls, rect, speed):
+    # Exit mask for a rect stepping `speed` pixels, by collision probes
+    mask = 0
+    for d, (dx, dy) in enumerate(DIRECTION_DELTAS):
+        if walls.any(rect.move(dx * speed, dy * speed)) is None:
+            mask |= 1 << d
+    return mask
+
+
+class FreeTable:
+    # Which top-left positions a sprite of the given size can take without
+    # touching a wall or leaving the level. Positions are cut into blocks of
+    # cell x cell, each with one byte per position. A block's flags only
+    # depend on the walls next to it, so identical blocks (most of a
+    # generated maze) share one pattern and the table stays small.
+
+    def __init__(self, size, cell, cols, rows, patterns, blocks):
+        self.size = tuple(size)
+        self.cell = cell
+        self.cols = cols
+        self.rows = rows
+        self.patterns = patterns
+        # Pattern index of every block, row by row
+        self.blocks = blocks
+
+    @classmethod
+    def build(cls, wall_coords, width, height, size, cell=40):
+        walls = SpatialGrid(_Box(pygame.Rect(w)) for w in wall_coords)
+        w, h = size
+        cols = -(-width // cell)
+        rows = -(-height // cell)
+        # Last positions that keep the sprite on the level
+        max_x, max_y = width - w, height - h
+        index = {}
+        patterns = []
+        blocks = array("I", bytes(4 * cols * rows))
+        for j in range(rows):
+            y0 = j * cell
+            for i in range(cols):
+                x0 = i * cell
+                # Blocked position spans (x0, y0, x1, y1) within the block,
+                # from every wall a sprite placed in the block could touch
+                spans = set()
+                for box in walls.collide(pygame.Rect(x0, y0, cell + w - 1, cell + h - 1)):
+                    r = box.rect
+                    spans.add((max(0, r.left - w + 1 - x0), max(0, r.top - h + 1 - y0),
+                               min(cell, r.right - x0), min(cell, r.bottom - y0)))
+                if x0 + cell - 1 > max_x:
+                    spans.add((max(0, max_x + 1 - x0), 0, cell, cell))
+                if y0 + cell - 1 > max_y:
+                    spans.add((0, max(0, max_y + 1 - y0), cell, cell))
+                key = tuple(sorted(spans))
+                k = index.get(key)
+                if k is None:
+                    k = index[key] = len(patterns)
+                    patterns.append(cls._pattern(key, cell))
+                blocks[j * cols + i] = k
+        return cls(size, cell, cols, rows, patterns, blocks)
+
+    @staticmethod
+    def _pattern(spans, cell):
+        flags = bytearray(b"\x01") * (cell * cell)
+        for x0, y0, x1, y1 in spans:
+            if x0 < x1:
+                for y in range(y0, y1):
+                    flags[y * cell + x0:y * cell + x1] = bytes(x1 - x0)
+        return bytes(flags)
+
+    def free(self, x, y):
+        # 1 if a sprite fits with its top-left at (x, y), else 0
+        cell = self.cell
+        i, px = divmod(x, cell)
+        j, py = divmod(y, cell)
+        if not (0 <= i < self.cols and 0 <= j < self.rows):
+            return 0
+        return self.patterns[self.blocks[j * self.cols + i]][py * cell + px]
+
+    def to_bytes(self):
+        w, h = self.size
+        header = FREE_HEADER.pack(w, h, self.cell, self.cols, self.rows, len(self.patterns))
+        return header + pack_blobs(self.blocks, b"".join(self.patterns))
+
+    @classmethod
+    def from_bytes(cls, data):
+        w, h, cell, cols, rows, count = read_header(FREE_HEADER, data, "free-position table")
+        blocks, patterns = unpack_blobs(data, FREE_HEADER.size, 2)
+        blocks = int_array(blocks, "I")
+        area = cell * cell
+        if len(blocks) != cols * rows or len(patterns) != count * area or max(blocks, default=0) >= count:
+            raise ValueError("Free-position table does not match its grid")
+        patterns = [patterns[k * area:(k + 1) * area] for k in range(count)]
+        return cls((w, h), cell, cols, rows, patterns, blocks)
+
+
+def reachable_spots(free, graph, starts):
+    # Flat array of x, y pairs: a free position centred on every navigation
+    # node the start positions can reach
+    w, h = free.size
+    seen = bytearray(graph.cols * graph.rows)
+    queue = deque()
+    for x, y in starts:
+        node = graph.node_at(x + w // 2, y + h // 2)
+        if node is not None and not seen[node]:
+            seen[node] = 1
+            queue.append(node)
+    spots = array("i")
+    exits = graph.exits
+    while queue:
+        node = queue.popleft()
+        x, y = graph.position(node)
+        x -= w // 2
+        y -= h // 2
+        if free.free(x, y):
+            spots.append(x)
+            spots.append(y)
+        for d in range(4):
+            if exits[node] & (1 << d):
+                nxt = graph.neighbour(node, d)
+                if not seen[nxt]:
+                    seen[nxt] = 1
+                    queue.append(nxt)
+    return spots
+
+
+class MoveTable:
+    # Legal exits for a sprite of the given speed, read from a FreeTable
+    # instead of collision probes: a direction is open when the position one
+    # step that way is free. Like the free flags, exit masks are kept per
+    # block pattern: each pattern gets a cell x cell table of the steps that
+    # stay inside the block, built the first time a ghost enters such a
+    # block. Steps out of the block (positions within one step of its edge)
+    # read the neighbouring block's flag. The tables are bounded by the
+    # level's own pattern count.
+    #
+    # free_spots (see reachable_spots) is for O(1) random teleports and
+    # respawns that always land somewhere legal.
+
+    def __init__(self, free, speed, spots):
+        self.free = free
+        self.size = free.size
+        self.speed = speed
+        self.cell = free.cell
+        self.cols = free.cols
+        self.rows = free.rows
+        self.blocks = free.blocks
+        # Inner exit masks per FreeTable pattern, None until first needed.
+        # A step as long as a block would skip over blocks: those are probed.
+        self.pattern_exits = [None] * len(free.patterns)
+        self.tabled = speed < free.cell
+        self.nearest = {}
+        self.free_spots = list(zip(spots[0::2], spots[1::2]))
+
+    def random_spot(self, rng):
+        # A random free position, or None if the table has none
+        if not self.free_spots:
+            return None
+        return self.free_spots[rng.randrange(len(self.free_spots))]
+
+    def nearest_spot(self, pos):
+        # Closest free position to pos (remembered per query position)
+        pos = tuple(pos)
+        spot = self.nearest.get(pos)
+        if spot is None:
+            spot = self.nearest[pos] = self._search_free(pos)
+        return spot
+
+    def _search_free(self, pos):
+        # Rings of growing radius around pos; a ring's points are all at least
+        # its radius away, so the search stops once that beats the best so far
+        x, y = pos
+        free = self.free.free
+        if free(x, y):
+            return pos
+        best, best_dist = None, None
+        for r in range(1, 2 * self.free.cell):
+            if best is not None and r * r >= best_dist:
+                return best
+            ring = [(x + dx, y - r) for dx in range(-r, r + 1)]
+            ring += [(x + dx, y + r) for dx in range(-r, r + 1)]
+            ring += [(x - r, y + dy) for dy in range(-r + 1, r)]
+            ring += [(x + r, y + dy) for dy in range(-r + 1, r)]
+            for spot in ring:
+                if free(*spot):
+                    dist = (spot[0] - x) ** 2 + (spot[1] - y) ** 2
+                    if best is None or dist < best_dist:
+                        best, best_dist = spot, dist
+        if best is None and self.free_spots:
+            best = min(self.free_spots, key=lambda p: (p[0] - x) ** 2 + (p[1] - y) ** 2)
+        return best
+
+    def exits_at(self, x, y):
+        cell = self.cell
+        i, px = divmod(x, cell)
+        j, py = divmod(y, cell)
+        if not (0 <= i < self.cols and 0 <= j < self.rows and self.tabled):
+            return self._probe(x, y)
+        pattern = self.blocks[j * self.cols + i]
+        exits = self.pattern_exits[pattern]
+        if exits is None:
+            exits = self.pattern_exits[pattern] = self._inner_exits(self.free.patterns[pattern])
+        mask = exits[py * cell + px]
+        speed = self.speed
+        edge = cell - speed
+        if speed <= px < edge and speed <= py < edge:
+            return mask
+        # Steps that leave the block
+        flag = self.free.free
+        if px < speed:
+            mask |= flag(x - speed, y)
+        if px >= edge:
+            mask |= flag(x + speed, y) << 1
+        if py < speed:
+            mask |= flag(x, y - speed) << 2
+        if py >= edge:
+            mask |= flag(x, y + speed) << 3
+        return mask
+
+    def _probe(self, x, y):
+        free = self.free.free
+        speed = self.speed
+        return (free(x - speed, y) | free(x + speed, y) << 1
+                | free(x, y - speed) << 2 | free(x, y + speed) << 3)
+
+    def _inner_exits(self, pattern):
+        # Exit masks of one block pattern, counting only steps that stay in
+        # the block. Flags are 0 or 1 per byte, so whole rows combine as big
+        # ints without one byte carrying into the next.
+        cell = self.free.cell
+        speed = self.speed
+        pad = bytes(speed)
+        blank = bytes(cell)
+        rows = [pattern[y * cell:(y + 1) * cell] for y in range(cell)]
+        masks = []
+        for y, row in enumerate(rows):
+            left = pad + row[:cell - speed]
+            right = row[speed:] + pad
+            above = rows[y - speed] if y >= speed else blank
+            below = rows[y + speed] if y + speed < cell else blank
+            mask = (int.from_bytes(left, "big") | int.from_bytes(right, "big") << 1
+                    | int.from_bytes(above, "big") << 2 | int.from_bytes(below, "big") << 3)
+            masks.append(mask.to_bytes(cell, "big"))
+        return b"".join(masks)
+
+
+class FlowField:
+    # Distance from every lattice node to a target node (the player), shared
+    # by all chasing ghosts. When the target moves, only the nodes whose
+    # distance changes are touched: the new target's improvements spread out
+    # breadth-first, then nodes that depended on the old target are found
+    # and recomputed from their unaffected neighbours.
+
+    def __init__(self, graph):
+        self.graph = graph
+        count = graph.cols * graph.rows
+        self.neighbours = [
+            tuple(graph.neighbour(node, d) for d in range(4) if graph.exits[node] & (1 << d))
+            for node in range(count)]
+        self.dist = array("i", [UNREACHABLE]) * count
+        self.target = None
+
+    def set_target(self, node):
+        # Move the field's target; returns the number of nodes updated
+        if node is None or node == self.target:
+            return 0
+        if self.target is None:
+            changed = self._rebuild(node)
+        else:
+            changed = self._add_source(node) + self._remove_source(self.target)
+        self.target = node
+        return changed
+
+    def direction(self, node, allowed=0b1111):
+        # Directions (bitmask, limited to allowed) that step closer to the target
+        if node is None or self.dist[node] in (0, UNREACHABLE):
+            return 0
+        closer = self.dist[node] - 1
+        mask = 0
+        exits = self.graph.exits[node] & allowed
+        for d in range(4):
+            if exits & (1 << d) and self.dist[self.graph.neighbour(node, d)] == closer:
+                mask |= 1 << d
+        return mask
+
+    def _rebuild(self, source):
+        dist = self.dist
+        dist[:] = array("i", [UNREACHABLE]) * len(dist)
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            v = queue.popleft()
+            d = dist[v] + 1
+            for w in self.neighbours[v]:
+                if dist[w] == UNREACHABLE:
+                    dist[w] = d
+                    queue.append(w)
+        return len(dist)
+
+    def _add_source(self, source):
+        dist = self.dist
+        dist[source] = 0
+        frontier = [source]
+        changed = 1
+        while frontier:
+            nxt = []
+            for v in frontier:
+                d = dist[v] + 1
+                for w in self.neighbours[v]:
+                    if d < dist[w]:
+                        dist[w] = d
+                        nxt.append(w)
+            changed += len(nxt)
+            frontier = nxt
+        return changed
+
+    def _remove_source(self, old):
+        dist = self.dist
+        neighbours = self.neighbours
+
+        # Nodes that lost every neighbour one step closer to a target, found
+        # in order of distance so each support check sees settled neighbours
+        affected = set()
+        heap = [(0, old)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if v in affected or dist[v] != d:
+                continue
+            if v != old and any(dist[n] == d - 1 and n not in affected for n in neighbours[v]):
+                continue
+            affected.add(v)
+            for w in neighbours[v]:
+                if dist[w] == d + 1:
+                    heapq.heappush(heap, (d + 1, w))
+
+        # Recompute them from their unaffected neighbours
+        heap = []
+        for v in affected:
+            best = min((dist[n] for n in neighbours[v] if n not in affected), default=UNREACHABLE)
+            dist[v] = UNREACHABLE if best == UNREACHABLE else best + 1
+            if dist[v] != UNREACHABLE:
+                heap.append((dist[v], v))
+        heapq.heapify(heap)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d != dist[v]:
+                continue
+            for w in neighbours[v]:
+                if w in affected and d + 1 < dist[w]:
+                    dist[w] = d + 1
+                    heapq.heappush(heap, (d + 1, w))
+        return len(affected)
@@ -0,0 +1,111 @@
+# Observation export for agents and analytics. Observer fills preallocated
+# NumPy buffers straight from the engine state (wall mask, pellet grids,
+# player, ghosts, power timer) without rendering anything. FrameView gives
+# a downsampled and optionally grayscale copy of a rendered surface, read
+# through surfarray.pixels3d so the full frame is never copied first.
+#
+# Requires NumPy.
+import numpy as np
+import pygame
+
+from game import SCREEN_WIDTH, SCREEN_HEIGHT
+
+# Grayscale weights (sum 256) for R, G, B
+GRAY_WEIGHTS = (77, 150, 29)
+
+
+class Observer:
+    # Buffers for num_envs games that share a maze and ghost count. fill(i, game)
+    # overwrites slot i in place; the arrays are reused, so copy anything that
+    # must outlive the next fill.
+    def __init__(self, game, num_envs=1, wall_cell=10):
+        self.num_envs = num_envs
+        self.rows = game.pellets.rows
+        self.cols = game.pellets.cols
+
+        # Static: True where a wall touches the wall_cell x wall_cell block
+        # (a partial block at the right or bottom edge is left out)
+        level = game.level
+        self.walls = np.zeros((level.height // wall_cell, level.width // wall_cell), dtype=bool)
+        for x, y, w, h in level.walls:
+            if w > 0 and h > 0:
+                self.walls[max(y, 0) // wall_cell:(y + h - 1) // wall_cell + 1,
+                           max(x, 0) // wall_cell:(x + w - 1) // wall_cell + 1] = True
+
+        self.buffers = {
+            # x, y, change_x, change_y
+            "player": np.zeros((num_envs, 4), dtype=np.int32),
+            # x, y, edible, alive per ghost slot
+            "ghosts": np.zeros((num_envs, game.ghost_count, 4), dtype=np.int32),
+            "pellets": np.zeros((num_envs, self.rows, self.cols), dtype=np.uint8),
+            "power_pellets": np.zeros((num_envs, self.rows, self.cols), dtype=np.uint8),
+            "power_timer": np.zeros(num_envs, dtype=np.int32),
+            "edible": np.zeros(num_envs, dtype=bool),
+        }
+        self.ghost_slots = [None] * num_envs
+
+    def track(self, i, game):
+        # Fixed ghost slots for the observation, kept for the whole episode;
+        # call after every reset of game
+        self.ghost_slots[i] = game.ghost_list.sprites()
+
+    def fill(self, i, game):
+        buffers = self.buffers
+        player = game.player
+        buffers["player"][i] = (player.rect.x, player.rect.y, player.change_x, player.change_y)
+        # The pellet grids are bytearrays; read them in place
+        shape = (self.rows, self.cols)
+        np.copyto(buffers["pellets"][i], np.frombuffer(game.pellets.cells, dtype=np.uint8).reshape(shape))
+        np.copyto(buffers["power_pellets"][i],
+                  np.frombuffer(game.power_pellets.cells, dtype=np.uint8).reshape(shape))
+        buffers["power_timer"][i] = game.power_timer
+        buffers["edible"][i] = game.ghost_edible
+
+        ghosts = buffers["ghosts"][i]
+        if game.swarm is not None:
+            swarm = game.swarm
+            ghosts[:, 0] = swarm.x
+            ghosts[:, 1] = swarm.y
+            np.logical_and(swarm.edible, swarm.alive, out=ghosts[:, 2], casting="unsafe")
+            ghosts[:, 3] = swarm.alive
+        else:
+            if self.ghost_slots[i] is None:
+                self.track(i, game)
+            for slot, ghost in enumerate(self.ghost_slots[i]):
+                alive = ghost.alive()
+                ghosts[slot] = (ghost.rect.x, ghost.rect.y, ghost.edible and alive, alive)
+        return buffers
+
+
+class FrameView:
+    # Every scale-th pixel of a surface, as (height, width, 3) RGB or
+    # (height, width) grayscale uint8, written into a reused buffer
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), scale=2, grayscale=True):
+        width, height = size
+        self.scale = scale
+        self.grayscale = grayscale
+        shape = (-(-height // scale), -(-width // scale))
+        if grayscale:
+            self.frame = np.zeros(shape, dtype=np.uint8)
+            self._sum = np.zeros(shape, dtype=np.uint16)
+            self._term = np.zeros(shape, dtype=np.uint16)
+        else:
+            self.frame = np.zeros(shape + (3,), dtype=np.uint8)
+
+    def capture(self, surface):
+        # pixels3d is a view that locks the surface; it is released before returning
+        pixels = pygame.surfarray.pixels3d(surface)
+        view = pixels[::self.scale, ::self.scale].transpose(1, 0, 2)
+        if self.grayscale:
+            total = self._sum
+            term = self._term
+            np.multiply(view[..., 0], GRAY_WEIGHTS[0], out=total, dtype=np.uint16)
+            np.multiply(view[..., 1], GRAY_WEIGHTS[1], out=term, dtype=np.uint16)
+            total += term
+            np.multiply(view[..., 2], GRAY_WEIGHTS[2], out=term, dtype=np.uint16)
+            total += term
+            np.right_shift(total, 8, out=self.frame, casting="unsafe")
+        else:
+            np.copyto(self.frame, view)
+        del view, pixels
+        return self.frame
@@ -0,0 +1,98 @@
+# Pellets live on a regular lattice, so instead of one sprite per pellet a
+# PelletGrid keeps one byte per lattice point plus a running count. Eating
+# only inspects the lattice points under the player's rect.
+import pygame
+
+
+class PelletGrid:
+    def __init__(self, origin, spacing, cols, rows, size, color):
+        self.origin_x, self.origin_y = origin
+        self.spacing = spacing
+        self.cols = cols
+        self.rows = rows
+        self.size = size
+        self.color = color
+        self.cells = bytearray(cols * rows)
+        self.count = 0
+        # Indices eaten since the last clear/load, in order, so a renderer can
+        # erase just those
+        self.eaten = []
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Indices of lattice points that still hold a pellet
+        return (i for i, cell in enumerate(self.cells) if cell)
+
+    def clear(self):
+        self.cells[:] = bytes(len(self.cells))
+        self.count = 0
+        self.eaten = []
+
+    def load(self, cells):
+        # Set the whole lattice from bytes of 0/1 values, e.g. a compiled level
+        self.cells[:] = cells
+        self.count = self.cells.count(1)
+        self.eaten = []
+
+    def index(self, x, y):
+        # Lattice index for a pellet centred at (x, y), or None if off the lattice
+        i, rx = divmod(x - self.origin_x, self.spacing)
+        j, ry = divmod(y - self.origin_y, self.spacing)
+        if rx or ry or not (0 <= i < self.cols and 0 <= j < self.rows):
+            return None
+        return j * self.cols + i
+
+    def center(self, index):
+        j, i = divmod(index, self.cols)
+        return self.origin_x + i * self.spacing, self.origin_y + j * self.spacing
+
+    def rect(self, index):
+        rect = pygame.Rect(0, 0, self.size, self.size)
+        rect.center = self.center(index)
+        return rect
+
+    def place(self, index):
+        if not self.cells[index]:
+            self.cells[index] = 1
+            self.count += 1
+
+    def _span(self, rect):
+        # Lattice columns/rows whose pellet rect overlaps rect (may be empty)
+        half = self.size // 2
+        sp = self.spacing
+        i0 = max(0, -((self.origin_x + self.size - half - rect.left - 1) // sp))
+        i1 = min(self.cols - 1, (rect.right + half - 1 - self.origin_x) // sp)
+        j0 = max(0, -((self.origin_y + self.size - half - rect.top - 1) // sp))
+        j1 = min(self.rows - 1, (rect.bottom + half - 1 - self.origin_y) // sp)
+        return i0, i1, j0, j1
+
+    def covering(self, rect):
+        # Lattice indices whose pellet would overlap rect, eaten or not
+        i0, i1, j0, j1 = self._span(rect)
+        cols = self.cols
+        return [j * cols + i for j in range(j0, j1 + 1) for i in range(i0, i1 + 1)]
+
+    def overlapping(self, rect):
+        i0, i1, j0, j1 = self._span(rect)
+        cells = self.cells
+        cols = self.cols
+        return [j * cols + i for j in range(j0, j1 + 1) for i in range(i0, i1 + 1)
+                if cells[j * cols + i]]
+
+    def eat(self, rect):
+        # Remove pellets overlapping rect; returns how many were eaten
+        eaten = self.overlapping(rect)
+        if eaten:
+            for index in eaten:
+                self.cells[index] = 0
+            self.count -= len(eaten)
+            self.eaten += eaten
+        return len(eaten)
+
+    def draw(self, surface, indices=None, offset=(0, 0)):
+        # offset is the level position of the surface's top-left corner
+        ox, oy = offset
+        for index in self if indices is None else indices:
+            surface.fill(self.color, self.rect(index).move(-ox, -oy))
@@ -0,0 +1,143 @@
+# Frame-time instrumentation for the interactive loop. The loop calls
+# begin_frame(), mark(phase) after each phase and end_frame(); the time
+# between marks is kept per phase over a rolling window of frames, along
+# with the frame-to-frame interval. From those come p50/p95/p99 per phase,
+# frame-pacing jitter and, for frames that went over budget, which phase
+# took the longest. The loop only calls in here when profiling is switched
+# on, so a disabled profiler costs one "is not None" check per phase.
+import time
+from array import array
+from collections import Counter
+
+import pygame
+
+from game import SCREEN_WIDTH, SCREEN_HEIGHT, BLACK, WHITE
+
+FRAME_BUDGET = 1 / 60
+# Phases that wait rather than work; left out of the over-budget check
+IDLE_PHASES = ("tick",)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class FrameProfiler:
+    def __init__(self, window=600, log_interval=5.0, budget=FRAME_BUDGET):
+        self.window = window
+        self.log_interval = log_interval
+        self.budget = budget
+        self.samples = {}
+        self.intervals = array("d", bytes(8 * window))
+        self.frames = 0
+        self.current = {}
+        # Also valid when switched on halfway through a frame
+        self.last = time.perf_counter()
+        self.frame_start = None
+        self.over_budget = 0
+        self.blame = Counter()
+        self.next_log = time.perf_counter() + log_interval
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.intervals[self.frames % self.window] = now - self.frame_start
+        self.frame_start = self.last = now
+        self.current.clear()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        slot = self.frames % self.window
+        for phase, seconds in self.current.items():
+            samples = self.samples.get(phase)
+            if samples is None:
+                samples = self.samples[phase] = array("d", bytes(8 * self.window))
+            samples[slot] = seconds
+        work = sum(seconds for phase, seconds in self.current.items() if phase not in IDLE_PHASES)
+        if work > self.budget:
+            self.over_budget += 1
+            busy = {phase: s for phase, s in self.current.items() if phase not in IDLE_PHASES}
+            self.blame[max(busy, key=busy.get)] += 1
+        self.frames += 1
+
+        if self.log_interval and self.last >= self.next_log:
+            self.next_log = self.last + self.log_interval
+            print(self.log_line())
+
+    def _filled(self, samples):
+        return samples[:min(self.frames, self.window)]
+
+    def stats(self):
+        # {phase: (p50, p95, p99)} in milliseconds, plus "frame" for the interval
+        result = {}
+        for phase, samples in self.samples.items():
+            ordered = sorted(self._filled(samples))
+            result[phase] = tuple(percentile(ordered, f) * 1000 for f in (0.5, 0.95, 0.99))
+        ordered = sorted(self._filled(self.intervals)[1:])
+        result["frame"] = tuple(percentile(ordered, f) * 1000 for f in (0.5, 0.95, 0.99))
+        return result
+
+    def jitter(self):
+        # Standard deviation of the frame interval, in milliseconds
+        intervals = self._filled(self.intervals)[1:]
+        if len(intervals) < 2:
+            return 0.0
+        mean = sum(intervals) / len(intervals)
+        return (sum((t - mean) ** 2 for t in intervals) / len(intervals)) ** 0.5 * 1000
+
+    def log_line(self):
+        stats = self.stats()
+        p50, p95, p99 = stats.pop("frame")
+        busy = [phase for phase in stats if phase not in IDLE_PHASES]
+        worst = max(busy, key=lambda phase: stats[phase][2]) if busy else "-"
+        line = (f"frame p50 {p50:.1f} p95 {p95:.1f} p99 {p99:.1f} ms, jitter {self.jitter():.2f} ms, "
+                f"slowest {worst}, over budget {self.over_budget}/{self.frames}")
+        if self.blame:
+            line += " (" + ", ".join(f"{phase} x{n}" for phase, n in self.blame.most_common(3)) + ")"
+        return line
+
+
+class ProfilerOverlay:
+    # Table of per-phase percentiles in the bottom-right corner, re-rendered
+    # every `refresh` frames and blitted each frame
+    def __init__(self, profiler, refresh=30):
+        self.profiler = profiler
+        self.refresh = refresh
+        self.font = pygame.font.Font(None, 16)
+        self.surface = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+    def _render(self):
+        stats = self.profiler.stats()
+        rows = [("ms", "p50", "p95", "p99")]
+        rows += [(phase,) + tuple(f"{v:.2f}" for v in values) for phase, values in stats.items()]
+        line_height = self.font.get_linesize()
+        # Only ever grow, so a redraw always covers the previous overlay
+        width = max(self.rect.width, 150)
+        height = max(self.rect.height, (len(rows) + 1) * line_height + 6)
+        surface = pygame.Surface((width, height))
+        surface.fill(BLACK)
+        y = 3
+        for row in rows:
+            surface.blit(self.font.render(row[0], 1, WHITE), (4, y))
+            for column, value in enumerate(row[1:]):
+                text = self.font.render(value, 1, WHITE)
+                surface.blit(text, text.get_rect(topright=(70 + 38 * column, y)))
+            y += line_height
+        footer = f"jitter {self.profiler.jitter():.2f} ms  slow {self.profiler.over_budget}"
+        surface.blit(self.font.render(footer, 1, WHITE), (4, y))
+        self.surface = surface
+
+    def draw(self, screen):
+        # Returns the area drawn to
+        if self.surface is None or self.profiler.frames % self.refresh == 0:
+            self._render()
+        self.rect = screen.blit(self.surface, self.surface.get_rect(
+            bottomright=(SCREEN_WIDTH - 2, SCREEN_HEIGHT - 2)))
+        return self.rect
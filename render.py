@@ -0,0 +1,238 @@
+# Renderer with a camera.
+#
+# Walls and pellets are not sprites here: they are composed into a static
+# layer, and an eaten pellet is erased from that layer (the pellet grids log
+# what was eaten). Walls come from the wall spatial index and pellets from
+# the lattice span, so composing only touches what lies in the layer's area.
+#
+# A level that fits on the screen is drawn with dirty rectangles: only the
+# areas where sprites moved, appeared or disappeared (plus the HUD when it
+# changes or gets drawn over) are redrawn and pushed to the display with
+# display.update(rects).
+#
+# A bigger level scrolls: the camera follows the player and the layer is a
+# window around the view, recomposed when the view leaves it. Each frame
+# copies the view out of the window and blits only the ghosts inside it, so
+# the cost follows the screen size rather than the level size.
+import pygame
+
+from camera import Camera
+from game import BLACK, WHITE, ghost_variants
+
+# Sprites that moved further than this in one tick (teleports, respawns)
+# are drawn where they are instead of interpolated
+MAX_INTERPOLATED_STEP = 8
+
+# Extra level area composed on each side of the view when scrolling, as a
+# fraction of the screen size
+WINDOW_MARGIN = 0.5
+
+
+class Renderer:
+    def __init__(self, screen, hud):
+        self.screen = screen
+        self.hud = hud
+        self.view_size = screen.get_size()
+        self.background = pygame.Surface(self.view_size).convert()
+        self.background.fill(BLACK)
+        self.sprites = pygame.sprite.LayeredDirty()
+        self.sprites.clear(screen, self.background)
+        self.player = None
+        self.grids = ()
+        # How many of each grid's eaten pellets are already erased
+        self.erased = []
+        self.camera = None
+        self.scrolling = False
+        # The static layer and the level area it shows
+        self.layer = self.background
+        self.area = screen.get_rect()
+        self.window = None
+        self.hud_state = None
+        # (sprite, position) before the latest simulation tick
+        self.previous = []
+
+    def attach(self, game):
+        # Called for a new or reset game: compose the static layer, take the
+        # moving sprites and repaint everything
+        level = game.level
+        width, height = self.view_size
+        self.camera = Camera(self.view_size, (level.width, level.height))
+        self.scrolling = level.width > width or level.height > height
+        self.grids = (game.pellets, game.power_pellets)
+        self.erased = [len(grid.eaten) for grid in self.grids]
+        self.player = game.player
+        self.hud_state = None
+        self.previous = []
+        self.sprites.empty()
+
+        if self.scrolling:
+            if self.window is None:
+                margin_x, margin_y = int(width * WINDOW_MARGIN), int(height * WINDOW_MARGIN)
+                self.window = pygame.Surface((width + 2 * margin_x, height + 2 * margin_y)).convert()
+            self.layer = self.window
+            self.camera.follow(game.player.rect)
+            self._compose(game, self.camera.rect)
+            return
+
+        self.layer = self.background
+        self.area = self.screen.get_rect()
+        self._compose(game, self.area)
+        self.sprites.add(game.player)
+        self.sprites.add(game.ghost_list.sprites())
+        self.screen.blit(self.background, (0, 0))
+        self.sprites.repaint_rect(self.screen.get_rect())
+
+    def _compose(self, game, view):
+        # Draw the walls and pellets around view into the static layer
+        layer = self.layer
+        area = layer.get_rect(center=view.center)
+        self.area = area
+        ox, oy = area.topleft
+        layer.fill(BLACK)
+        for wall in game.wall_index.collide(area):
+            layer.fill(WHITE, wall.rect.move(-ox, -oy))
+        for grid in self.grids:
+            grid.draw(layer, grid.overlapping(area), area.topleft)
+
+    def capture(self, game):
+        # Called before a simulation tick: remember where the sprites were,
+        # so draw() can place them between that tick and the next
+        self.previous = [(sprite, sprite.rect.topleft)
+                         for sprite in (game.player, *game.ghost_list)]
+
+    def draw(self, game, profiler=None, alpha=1.0):
+        # Returns the list of screen rects that changed this frame. A
+        # profiler's mark() is called after the sprites and after the HUD.
+        # With alpha < 1 sprites are drawn that fraction of the way from
+        # their captured positions to their current ones.
+        if game.player is not self.player:
+            self.attach(game)
+        elif any(len(grid.eaten) != seen for grid, seen in zip(self.grids, self.erased)):
+            self._erase_eaten()
+        # Nothing moves once the game is over, and the banner must not be
+        # drawn over again for sprites settling under it
+        if alpha >= 1 or game.done or not self.previous:
+            return self._draw(game, profiler)
+        moved = []
+        for sprite, (px, py) in self.previous:
+            x, y = sprite.rect.topleft
+            if (x, y) == (px, py) or abs(x - px) + abs(y - py) > MAX_INTERPOLATED_STEP:
+                continue
+            moved.append((sprite, x, y))
+            sprite.rect.topleft = (round(px + (x - px) * alpha), round(py + (y - py) * alpha))
+            sprite.dirty = 1
+        try:
+            return self._draw(game, profiler)
+        finally:
+            for sprite, x, y in moved:
+                sprite.rect.topleft = (x, y)
+                # The real position still has to be drawn next frame
+                sprite.dirty = 1
+
+    def _draw(self, game, profiler=None):
+        if self.scrolling:
+            return self._draw_scrolling(game, profiler)
+        if game.swarm is not None:
+            return self._draw_swarm(game, profiler)
+
+        rects = self.sprites.draw(self.screen)
+        if profiler is not None:
+            profiler.mark("draw")
+
+        # Redraw the HUD if it changed or sprites were drawn over it
+        hud_state = (game.score, game.game_over, game.win)
+        hud_area = [self.hud.score_rect]
+        if game.done:
+            hud_area.append(self.hud.banner_rect)
+        if hud_state != self.hud_state or any(r.collidelist(rects) >= 0 for r in hud_area):
+            rects.extend(self.hud.draw(self.screen, game))
+            self.hud_state = hud_state
+        if profiler is not None:
+            profiler.mark("hud")
+        return rects
+
+    def repaint(self, rect):
+        # Restore an area something else drew over (e.g. an overlay that was
+        # hidden); a scrolling view is redrawn every frame anyway
+        if self.scrolling:
+            return
+        self.screen.blit(self.background, rect, rect)
+        self.sprites.repaint_rect(rect)
+        self.hud_state = None
+
+    def _erase_eaten(self):
+        erased = []
+        for k, grid in enumerate(self.grids):
+            erased.extend(grid.rect(index) for index in grid.eaten[self.erased[k]:])
+            self.erased[k] = len(grid.eaten)
+
+        ox, oy = self.area.topleft
+        for rect in erased:
+            if not self.area.colliderect(rect):
+                continue
+            local = rect.move(-ox, -oy)
+            self.layer.fill(BLACK, local)
+            # Restore any remaining pellet that shared those pixels
+            for grid in self.grids:
+                grid.draw(self.layer, grid.overlapping(rect), self.area.topleft)
+            if not self.scrolling:
+                self.sprites.repaint_rect(local)
+
+    def _visible_ghosts(self, game, view):
+        # (image, level position) for every ghost overlapping view
+        variants = [ghost_variants(image) for image in game.ghost_images]
+        k = len(variants)
+        swarm = game.swarm
+        if swarm is None:
+            return [(ghost.image, ghost.rect.topleft) for ghost in game.ghost_list
+                    if view.colliderect(ghost.rect)]
+        w, h = swarm.size
+        visible = (swarm.alive & (swarm.x < view.right) & (swarm.x + w > view.left)
+                   & (swarm.y < view.bottom) & (swarm.y + h > view.top)).nonzero()[0]
+        edible = swarm.edible.tolist()
+        return [(variants[i % k][edible[i]], (x, y))
+                for i, x, y in zip(visible.tolist(), swarm.x[visible].tolist(), swarm.y[visible].tolist())]
+
+    def _draw_scrolling(self, game, profiler=None):
+        camera = self.camera
+        camera.follow(game.player.rect)
+        view = camera.rect
+        if not self.area.contains(view):
+            self._compose(game, view)
+
+        screen = self.screen
+        screen.blit(self.layer, (0, 0), view.move(-self.area.x, -self.area.y))
+        ox, oy = view.topleft
+        player = game.player
+        blits = [(player.image, (player.rect.x - ox, player.rect.y - oy))]
+        blits += [(image, (x - ox, y - oy)) for image, (x, y) in self._visible_ghosts(game, view)]
+        screen.blits(blits, doreturn=False)
+        if profiler is not None:
+            profiler.mark("draw")
+
+        self.hud.draw(screen, game)
+        self.hud_state = (game.score, game.game_over, game.win)
+        if profiler is not None:
+            profiler.mark("hud")
+        return [screen.get_rect()]
+
+    def _draw_swarm(self, game, profiler=None):
+        # Swarm ghosts are not sprites and there are many of them: redraw the
+        # whole frame, then blit every live ghost in one blits() call
+        screen_rect = self.screen.get_rect()
+        self.sprites.repaint_rect(screen_rect)
+        self.sprites.draw(self.screen)
+
+        self.screen.blits(self._visible_ghosts(game, screen_rect), doreturn=False)
+        if profiler is not None:
+            profiler.mark("draw")
+
+        self.hud.draw(self.screen, game)
+        self.hud_state = (game.score, game.game_over, game.win)
+        if profiler is not None:
+            profiler.mark("hud")
+        return [screen_rect]
+
+    def present(self, rects):
+        if rects:
+            pygame.display.update(rects)
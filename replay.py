@@ -0,0 +1,160 @@
+# Input recording and replay.
+#
+# A recording holds the game options, then for each session its seed and
+# the player's input per frame, run-length encoded: after input handling the
+# player's velocity is always one of the five actions, so the per-frame
+# input is one action code. Replays re-simulate headless at full CPU speed.
+#
+# Layout: b"PMRP", version (B), flags (B: 1 = swarm, 2 = chase), ghost count (H),
+# the level as it was loaded (name or path, length H + UTF-8) and its key()
+# (40 hex digits), then records: 0xFF + seed (Q) starts a session; an action
+# byte 0-4 followed by a varint frame count is a run of frames with that input.
+# Version 2 stored only the level's name (length B + UTF-8); version 1 always
+# played the default level.
+import argparse
+import struct
+import time
+
+MAGIC = b"PMRP"
+VERSION = 3
+SESSION = 0xFF
+FLAG_SWARM = 1
+FLAG_CHASE = 2
+
+
+class Recorder:
+    def __init__(self, game):
+        flags = (FLAG_SWARM if game.use_swarm else 0) | (FLAG_CHASE if game.chase else 0)
+        self.data = bytearray(MAGIC + struct.pack("<BBH", VERSION, flags, game.ghost_count))
+        source = (game.level_source or game.level.name).encode()
+        self.data += struct.pack("<H", len(source)) + source + game.level.key().encode()
+        self.action = None
+        self.count = 0
+        self.start(game.seed)
+
+    def _flush(self):
+        if self.count:
+            self.data.append(self.action)
+            count = self.count
+            while count >= 0x80:
+                self.data.append(0x80 | (count & 0x7F))
+                count >>= 7
+            self.data.append(count)
+        self.action = None
+        self.count = 0
+
+    def start(self, seed):
+        # A new session (game start or restart) with this seed
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError(f"Seed {seed} does not fit in 64 bits")
+        self._flush()
+        self.data.append(SESSION)
+        self.data += struct.pack("<Q", seed)
+
+    def record(self, action):
+        # The input for one stepped frame
+        if action != self.action:
+            self._flush()
+            self.action = action
+        self.count += 1
+
+    def getvalue(self):
+        self._flush()
+        return bytes(self.data)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.getvalue())
+
+
+def read_replay(data):
+    # Returns (options, sessions) where sessions is [(seed, [(action, frames), ...])]
+    if data[:4] != MAGIC:
+        raise ValueError("Not a PacMac replay")
+    version, flags, ghost_count = struct.unpack_from("<BBH", data, 4)
+    if not 1 <= version <= VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    options = {"swarm": bool(flags & FLAG_SWARM), "chase": bool(flags & FLAG_CHASE),
+               "ghost_count": ghost_count}
+    sessions = []
+    pos = 8
+    if version >= 3:
+        length = struct.unpack_from("<H", data, pos)[0]
+        pos += 2
+        options["level"] = data[pos:pos + length].decode()
+        options["level_key"] = data[pos + length:pos + length + 40].decode()
+        pos += length + 40
+    elif version == 2:
+        length = data[pos]
+        options["level"] = data[pos + 1:pos + 1 + length].decode()
+        pos += 1 + length
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        if tag == SESSION:
+            sessions.append((struct.unpack_from("<Q", data, pos)[0], []))
+            pos += 8
+            continue
+        if not sessions:
+            raise ValueError("Replay input before the first session")
+        count = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            count |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        sessions[-1][1].append((tag, count))
+    return options, sessions
+
+
+def make_recorded_game(options):
+    # A headless Game for read_replay() options. Refuses a level file that
+    # changed since the recording, which would replay to different results.
+    # headless is imported here: it switches SDL to its dummy drivers, which
+    # the interactive game (it records through this module) must not get.
+    from headless import make_game
+    options = dict(options)
+    key = options.pop("level_key", None)
+    game = make_game(None, **options)
+    if key is not None and game.level.key() != key:
+        raise ValueError(f"Level {options['level']!r} has changed since the recording was made")
+    return game
+
+
+def replay(data, game=None):
+    # Re-simulate every session in a recording; returns their final states
+    options, sessions = read_replay(data)
+    if game is None:
+        game = make_recorded_game(options)
+    results = []
+    for seed, runs in sessions:
+        game.reset(seed)
+        step = game.step
+        for action, count in runs:
+            for _ in range(count):
+                step(action)
+        results.append(game.state())
+    return results
+
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-simulate recorded PacMac games")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.files:
+        start = time.perf_counter()
+        results = replay(load_replay(path))
+        elapsed = time.perf_counter() - start
+        frames = sum(state["frame"] for state in results)
+        for state in results:
+            outcome = "win" if state["win"] else "game over" if state["game_over"] else "quit"
+            print(f"{path}: score {state['score']}, {state['frame']} frames, {outcome}")
+        print(f"{path}: {len(results)} sessions, {frames} frames in {elapsed:.3f}s")
@@ -0,0 +1,64 @@
+# Uniform-grid spatial index: sprites are bucketed by every cell their rect
+# overlaps, so a rect query only looks at the handful of cells it touches.
+
+
+class SpatialGrid:
+    def __init__(self, sprites=(), cell_size=40):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.order = {}
+        for sprite in sprites:
+            self.add(sprite)
+
+    @classmethod
+    def from_buckets(cls, sprites, buckets, cell_size=40):
+        # Rebuild from precomputed {cell: [index into sprites]}, e.g. a compiled level
+        grid = cls(cell_size=cell_size)
+        grid.order = {sprite: i for i, sprite in enumerate(sprites)}
+        grid.cells = {cell: [sprites[i] for i in indices] for cell, indices in buckets.items()}
+        return grid
+
+    def __len__(self):
+        return len(self.order)
+
+    def _span(self, rect):
+        cs = self.cell_size
+        return (rect.left // cs, (rect.right - 1) // cs,
+                rect.top // cs, (rect.bottom - 1) // cs)
+
+    def add(self, sprite):
+        self.order[sprite] = len(self.order)
+        x0, x1, y0, y1 = self._span(sprite.rect)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), []).append(sprite)
+
+    def clear(self):
+        self.cells.clear()
+        self.order.clear()
+
+    def collide(self, rect):
+        # Sprites overlapping rect, in insertion order (like spritecollide on a Group)
+        x0, x1, y0, y1 = self._span(rect)
+        if x0 == x1 and y0 == y1:
+            return [s for s in self.cells.get((x0, y0), ()) if rect.colliderect(s.rect)]
+        hits = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for sprite in self.cells.get((cx, cy), ()):
+                    if sprite not in hits and rect.colliderect(sprite.rect):
+                        hits[sprite] = None
+        if len(hits) > 1:
+            return sorted(hits, key=self.order.__getitem__)
+        return list(hits)
+
+    def any(self, rect):
+        # First sprite found overlapping rect, or None
+        x0, x1, y0, y1 = self._span(rect)
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for sprite in cells.get((cx, cy), ()):
+                    if rect.colliderect(sprite.rect):
+                        return sprite
+        return None
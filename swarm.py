@@ -0,0 +1,183 @@
+# Struct-of-arrays ghost engine. Positions, directions and counters for every
+# ghost live in NumPy arrays and all ghosts advance in one batched step
+# against the level's compiled free-position table, following the same
+# wandering rules as Ghost.update. Used for swarm levels with hundreds or
+# thousands of ghosts.
+#
+# Requires NumPy; the rest of the game does not.
+import struct
+import weakref
+
+import numpy as np
+
+# Direction codes 0-3 index navigation.DIRECTIONS (left, right, up, down)
+
+# GhostSwarm.snapshot() header: slots, live ghosts and the PCG64 state
+# (state, increment, buffered uint32), followed by the raw arrays
+SWARM_HEADER = struct.Struct("<II16s16sII")
+
+# NumPy views of each navigation.MoveTable, kept as long as its level keeps it
+_tables = weakref.WeakKeyDictionary()
+
+
+def swarm_table(moves):
+    # (patterns, blocks, free_x, free_y) for a MoveTable: its FreeTable's
+    # per-block patterns as a (patterns, cell, cell) bool array, the pattern
+    # index of every block as a (rows, cols) array, and the teleport spots
+    table = _tables.get(moves)
+    if table is None:
+        free = moves.free
+        patterns = np.frombuffer(b"".join(free.patterns), dtype=bool).reshape(-1, free.cell, free.cell)
+        blocks = np.frombuffer(free.blocks, dtype=np.uintc).reshape(free.rows, free.cols)
+        spots = np.array(moves.free_spots, dtype=np.int32).reshape(-1, 2)
+        table = _tables[moves] = (patterns, blocks, spots[:, 0].copy(), spots[:, 1].copy())
+    return table
+
+
+class GhostSwarm:
+    # moves is the level's navigation.MoveTable for the ghost size and
+    # speed. A game makes its swarm once; reset() puts the ghosts back on
+    # their spawns in the same arrays.
+    def __init__(self, moves, spawns, count, seed=None):
+        self.size = moves.size
+        self.speed = speed = moves.speed
+        self.cell = moves.free.cell
+        self.patterns, self.blocks, self.free_x, self.free_y = swarm_table(moves)
+        self.dx = np.array([-speed, speed, 0, 0], dtype=np.int32)
+        self.dy = np.array([0, 0, -speed, speed], dtype=np.int32)
+
+        # Spawn points overlapping a wall move to the closest free spot, as
+        # they do for Ghost sprites
+        spawns = np.array([moves.nearest_spot(spawn) or spawn for spawn in spawns],
+                          dtype=np.int32).reshape(-1, 2)
+        self.spawn_x = spawns[np.arange(count) % len(spawns), 0]
+        self.spawn_y = spawns[np.arange(count) % len(spawns), 1]
+        self.x = np.empty(count, dtype=np.int32)
+        self.y = np.empty(count, dtype=np.int32)
+        self.direction = np.empty(count, dtype=np.int8)
+        self.steps_remaining = np.empty(count, dtype=np.int32)
+        self.stuck_counter = np.empty(count, dtype=np.int32)
+        self.edible = np.empty(count, dtype=bool)
+        self.alive = np.empty(count, dtype=bool)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Every ghost back on its spawn, with a new random stream
+        self.rng = np.random.default_rng(seed)
+        count = len(self.x)
+        self.x[:] = self.spawn_x
+        self.y[:] = self.spawn_y
+        self.direction[:] = self.rng.integers(0, 4, count)
+        self.steps_remaining[:] = self.rng.integers(15, 61, count)
+        self.stuck_counter[:] = 0
+        self.edible[:] = False
+        self.alive[:] = True
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def _fits(self, x, y):
+        # Looked up per block like FreeTable.free; off the table is never free
+        cell = self.cell
+        rows, cols = self.blocks.shape
+        inside = (x >= 0) & (y >= 0) & (x < cols * cell) & (y < rows * cell)
+        x = np.clip(x, 0, cols * cell - 1)
+        y = np.clip(y, 0, rows * cell - 1)
+        return self.patterns[self.blocks[y // cell, x // cell], y % cell, x % cell] & inside
+
+    def update(self):
+        alive = np.flatnonzero(self.alive)
+        if not len(alive):
+            return
+        x = self.x[alive]
+        y = self.y[alive]
+        direction = self.direction[alive]
+        steps = self.steps_remaining[alive]
+
+        # Change direction when the timer expires or the way ahead is blocked
+        turn = (steps <= 0) | ~self._fits(x + self.dx[direction], y + self.dy[direction])
+        if turn.any():
+            tx = x[turn, None] + self.dx
+            ty = y[turn, None] + self.dy
+            legal = self._fits(tx, ty)
+            # A random key per direction: the best legal key is a uniform pick
+            keys = np.where(legal, self.rng.random(legal.shape), -1.0)
+            choice = keys.argmax(1)
+            found = legal.any(1)
+            new_direction = direction[turn]
+            new_direction[found] = choice[found]
+            new_steps = np.zeros(len(choice), dtype=np.int32)
+            new_steps[found] = self.rng.integers(15, 61, found.sum())
+            direction[turn] = new_direction
+            steps[turn] = new_steps
+
+        nx = x + self.dx[direction]
+        ny = y + self.dy[direction]
+        moved = self._fits(nx, ny)
+        x = np.where(moved, nx, x)
+        y = np.where(moved, ny, y)
+        steps = np.where(moved, steps - 1, 0)
+        stuck = np.where(moved, 0, self.stuck_counter[alive] + 1)
+
+        # Relocate ghosts stuck for too long to a random free spot
+        teleport = stuck > 60
+        if teleport.any() and len(self.free_x):
+            pick = self.rng.integers(0, len(self.free_x), teleport.sum())
+            x[teleport] = self.free_x[pick]
+            y[teleport] = self.free_y[pick]
+            stuck[teleport] = 0
+
+        self.x[alive] = x
+        self.y[alive] = y
+        self.direction[alive] = direction
+        self.steps_remaining[alive] = steps
+        self.stuck_counter[alive] = stuck
+
+    def set_edible(self, edible=True):
+        self.edible[self.alive] = edible
+
+    def collide(self, rect):
+        # Indices of live ghosts overlapping rect
+        w, h = self.size
+        hit = (self.alive & (self.x < rect.right) & (self.x + w > rect.left)
+               & (self.y < rect.bottom) & (self.y + h > rect.top))
+        return np.flatnonzero(hit)
+
+    def kill(self, indices):
+        indices = np.asarray(indices)
+        indices = indices[self.alive[indices]]
+        self.alive[indices] = False
+        self.count -= len(indices)
+
+    def _arrays(self):
+        return (self.x, self.y, self.direction, self.steps_remaining, self.stuck_counter,
+                self.edible, self.alive)
+
+    def snapshot(self):
+        rng = self.rng.bit_generator.state
+        header = SWARM_HEADER.pack(len(self.x), self.count, rng["state"]["state"].to_bytes(16, "little"),
+                                   rng["state"]["inc"].to_bytes(16, "little"), rng["has_uint32"],
+                                   rng["uinteger"])
+        return b"".join([header] + [array.tobytes() for array in self._arrays()])
+
+    def restore(self, data):
+        # Copies a snapshot() back into the existing arrays
+        slots, count, state, inc, has_uint32, uinteger = SWARM_HEADER.unpack_from(data)
+        if slots != len(self.x):
+            raise ValueError("Snapshot is from a different swarm size")
+        self.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": int.from_bytes(state, "little"), "inc": int.from_bytes(inc, "little")},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+        offset = SWARM_HEADER.size
+        for array in self._arrays():
+            array[:] = np.frombuffer(data, array.dtype, len(array), offset)
+            offset += array.nbytes
+        self.count = count
+
+    def positions(self):
+        alive = np.flatnonzero(self.alive)
+        return alive, self.x[alive], self.y[alive]
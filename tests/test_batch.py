@@ -0,0 +1,106 @@
+import argparse
+import json
+
+import pytest
+
+import batch
+import headless
+from game import POWER_DURATION
+from replay import Recorder, replay
+
+GAME = {"level": "default", "ghost_count": None, "ghost_speed": 2,
+        "power_duration": POWER_DURATION, "chase": False, "swarm": False}
+
+
+def row(score, frames, win=False, end_reason="caught"):
+    return {"score": score, "frames": frames, "win": win, "end_reason": end_reason}
+
+
+def test_summarize():
+    rows = [row(score, 100) for score in range(1, 20)] + [row(500, 1000, True, "cleared")]
+    summary = batch.summarize(rows, 2.0)
+    assert summary["episodes"] == 20 and summary["wins"] == 1
+    assert summary["win_rate"] == 0.05
+    assert summary["score_mean"] == (sum(range(1, 20)) + 500) / 20
+    assert summary["score_median"] == 10.5
+    assert summary["score_p95"] == 500 and summary["score_max"] == 500
+    assert summary["frames_mean"] == 145
+    assert summary["end_reasons"] == {"caught": 19, "cleared": 1}
+    assert summary["episodes_per_s"] == 10 and summary["frames_per_s"] == 1450
+
+
+def test_summarize_without_rows():
+    summary = batch.summarize([], 0)
+    assert summary["episodes"] == 0 and summary["win_rate"] == 0
+    assert summary["score_max"] == 0 and summary["frames_per_s"] == 0
+
+
+def record(path, seeds, **options):
+    game = headless.make_game(seeds[0], **options)
+    recorder = Recorder(game)
+    for i, seed in enumerate(seeds):
+        if i:
+            game.reset(seed)
+            recorder.start(seed)
+        for frame in range(300):
+            action = frame // 20 % 5
+            recorder.record(action)
+            game.step(action)
+    recorder.save(path)
+    return str(path)
+
+
+def test_make_jobs_numbers_seeded_episodes():
+    args = argparse.Namespace(policy="random", seed=40, episodes=3, replay=[])
+    assert batch.make_jobs(args, GAME) == [(GAME, [(0, 40, None), (1, 41, None), (2, 42, None)])]
+
+
+def test_make_jobs_groups_recordings_by_their_options(tmp_path):
+    paths = [record(tmp_path / "a.pmr", [1, 2]),
+             record(tmp_path / "b.pmr", [3], swarm=True, ghost_count=7),
+             record(tmp_path / "c.pmr", [4])]
+    args = argparse.Namespace(policy="replay", seed=0, episodes=0, replay=paths)
+    groups = batch.make_jobs(args, GAME)
+    assert len(groups) == 2
+    (plain, plain_jobs), (swarm, swarm_jobs) = groups
+    assert not plain["swarm"] and plain["ghost_count"] == 4
+    assert swarm["swarm"] and swarm["ghost_count"] == 7
+    # Options that are not recorded come from the command line
+    assert plain["power_duration"] == swarm["power_duration"] == POWER_DURATION
+    assert [job[:2] for job in plain_jobs] == [(0, 1), (1, 2), (3, 4)]
+    assert [job[:2] for job in swarm_jobs] == [(2, 3)]
+
+
+def test_run_chunk_replays_recordings(tmp_path):
+    path = record(tmp_path / "a.pmr", [5, 6, 7], chase=True)
+    args = argparse.Namespace(policy="replay", seed=0, episodes=0, replay=[path])
+    [(options, jobs)] = batch.make_jobs(args, GAME)
+    rows = batch.run_chunk({"policy": "replay", "max_frames": 0, "game": options}, jobs)
+    with open(path, "rb") as f:
+        states = replay(f.read())
+    assert [(r["seed"], r["score"], r["frames"], r["win"]) for r in rows] == \
+        [(seed, s["score"], s["frame"], s["win"]) for seed, s in zip([5, 6, 7], states)]
+
+
+@pytest.mark.parametrize("policy", ["random", "seeker"])
+def test_run_chunk_plays_seeded_episodes(policy):
+    config = {"policy": policy, "max_frames": 2000, "game": GAME}
+    rows = batch.run_chunk(config, [(0, 3, None), (1, 4, None)])
+    for r in rows:
+        game = headless.make_game(r["seed"])
+        if policy == "seeker":
+            state = headless.run_episode(r["seed"], headless.pellet_seeker_policy(), 2000, game)
+        else:
+            state = headless.run_episode(r["seed"], max_frames=2000, game=game)
+        assert (r["score"], r["frames"], r["win"]) == (state["score"], state["frame"], state["win"])
+        assert r["pellets_left"] == game.pellets.count
+
+
+def test_main_writes_every_episode(tmp_path, capsys):
+    out = tmp_path / "results.jsonl"
+    summary = batch.main(["--episodes", "6", "--workers", "2", "--chunk-size", "2",
+                          "--max-frames", "500", "--out", str(out)])
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["episode"] for r in rows) == list(range(6))
+    assert summary["episodes"] == 6
+    assert summary["score_max"] == max(r["score"] for r in rows)
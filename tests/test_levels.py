@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+import headless
+import levels
+from levels import Level, compile_level, load_level
+from mazegen import generate_level
+
+
+@pytest.fixture
+def fresh(monkeypatch, tmp_path):
+    # No compiled levels in memory and an empty disk cache
+    monkeypatch.setattr(levels, "_levels", {})
+    return str(tmp_path / "cache")
+
+
+def copy(level):
+    return Level.from_dict(level.to_dict())
+
+
+def compiled_state(level):
+    return (level.collision, bytes(level.pellet_cells), bytes(level.power_cells),
+            level.graph.to_bytes(), level.ghost_free.to_bytes(), list(level.ghost_spots))
+
+
+@pytest.mark.parametrize("source", ["default", generate_level(11, 9, seed=6)], ids=["default", "generated"])
+def test_cached_level_matches_a_fresh_compile(fresh, source):
+    level = load_level(cache_dir=fresh) if source == "default" else compile_level(copy(source), fresh)
+    [name] = os.listdir(fresh)
+    assert name == f"level-{level.key()}.bin"
+
+    cached = copy(level)
+    with open(os.path.join(fresh, name), "rb") as f:
+        cached.load_compiled(f.read())
+    assert compiled_state(cached) == compiled_state(level)
+    assert cached.to_bytes() == level.to_bytes()
+
+
+@pytest.mark.parametrize("damage", [lambda data: data[:len(data) // 2],
+                                    lambda data: data[:6],
+                                    lambda data: b"PKL!" + data[4:],
+                                    lambda data: b""], ids=["truncated", "header", "magic", "empty"])
+def test_damaged_cache_files_are_recompiled(fresh, monkeypatch, damage):
+    level = compile_level(generate_level(8, 8, seed=1), fresh)
+    expected = compiled_state(level)
+    path = os.path.join(fresh, f"level-{level.key()}.bin")
+    with open(path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        copy(level).load_compiled(damage(data))
+
+    with open(path, "wb") as f:
+        f.write(damage(data))
+    monkeypatch.setattr(levels, "_levels", {})
+    again = compile_level(copy(level), fresh)
+    assert compiled_state(again) == expected
+    # The cache file was rewritten
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_cache_does_not_match_another_level(fresh):
+    level = compile_level(generate_level(8, 8, seed=1), fresh)
+    other = copy(level)
+    other.walls = other.walls[:-1]
+    with pytest.raises(ValueError):
+        other.load_compiled(level.to_bytes())
+
+
+def test_power_pellets_must_be_on_the_lattice():
+    data = generate_level(6, 6, seed=2).to_dict()
+    data["power_pellets"] = [[3, 3]]
+    with pytest.raises(ValueError):
+        Level.from_dict(data).compile()
+
+
+def test_games_share_the_level_but_keep_their_source(tmp_path):
+    path = tmp_path / "maze.json"
+    path.write_text(json.dumps(load_level().to_dict()))
+    by_name = headless.make_game(1)
+    by_path = headless.make_game(1, level=str(path))
+    by_object = headless.make_game(1, level=load_level())
+    assert by_name.level is by_path.level is by_object.level
+    assert by_name.level_source == "default"
+    assert by_path.level_source == str(path)
+    assert by_object.level_source is None
@@ -0,0 +1,83 @@
+from collections import deque
+
+import pygame
+import pytest
+
+from levels import compile_level
+from mazegen import CORRIDOR, cell_center, generate_level
+
+SIZES = [(2, 2), (7, 4), (15, 15)]
+
+
+def reachable(graph, start):
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for d in range(4):
+            if graph.exits[node] & (1 << d):
+                nxt = graph.neighbour(node, d)
+                if nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(nxt)
+    return seen
+
+
+def cell_nodes(level, cols, rows):
+    return {level.graph.node_at(*cell_center(i, j)) for j in range(rows) for i in range(cols)}
+
+
+@pytest.mark.parametrize("cols, rows", SIZES)
+@pytest.mark.parametrize("loops", [0, 0.3])
+def test_every_cell_is_reachable(cols, rows, loops):
+    level = compile_level(generate_level(cols, rows, seed=cols, loops=loops))
+    nodes = cell_nodes(level, cols, rows)
+    assert None not in nodes and len(nodes) == cols * rows
+    x, y = level.player
+    assert nodes <= reachable(level.graph, level.graph.node_at(x + 10, y + 10))
+
+
+@pytest.mark.parametrize("cols, rows", SIZES)
+def test_no_loops_carves_a_spanning_tree(cols, rows):
+    level = compile_level(generate_level(cols, rows, seed=3, loops=0))
+    graph = level.graph
+    nodes = cell_nodes(level, cols, rows)
+    passages = sum(bin(graph.exits[node]).count("1") for node in nodes) // 2
+    assert passages == cols * rows - 1
+    looped = compile_level(generate_level(cols, rows, seed=3, loops=0.5)).graph
+    assert sum(bin(looped.exits[node]).count("1") for node in nodes) // 2 >= passages
+
+
+def test_same_seed_same_maze():
+    assert generate_level(12, 9, seed=5).to_dict() == generate_level(12, 9, seed=5).to_dict()
+    assert generate_level(12, 9, seed=5).walls != generate_level(12, 9, seed=6).walls
+
+
+@pytest.mark.parametrize("cols, rows", SIZES)
+def test_spawns_and_pellets_are_clear_of_walls(cols, rows):
+    level = compile_level(generate_level(cols, rows, seed=2, ghosts=6))
+    walls = [pygame.Rect(w) for w in level.walls]
+    player = pygame.Rect(level.player, (20, 20))
+    assert player.collidelist(walls) == -1
+    assert len(level.ghost_spawns) == 6
+    for x, y in level.ghost_spawns:
+        assert pygame.Rect(x, y, 24, 24).collidelist(walls) == -1
+        assert level.ghost_free.free(x, y)
+    # A pellet on every cell centre and power pellets in the other corners
+    grid = level.pellet_grid()
+    for j in range(rows):
+        for i in range(cols):
+            assert level.pellet_cells[grid.index(*cell_center(i, j))]
+    assert sum(level.power_cells) == 3
+    # Corridors are as wide as promised
+    for j in range(rows):
+        for i in range(cols):
+            cx, cy = cell_center(i, j)
+            square = pygame.Rect(0, 0, CORRIDOR, CORRIDOR)
+            square.center = (cx, cy)
+            assert square.collidelist(walls) == -1
+
+
+def test_too_small():
+    with pytest.raises(ValueError):
+        generate_level(1, 5)
@@ -0,0 +1,169 @@
+import random
+from collections import deque
+
+import pygame
+import pytest
+
+import headless
+from game import Wall
+from levels import compile_level, load_level
+from mazegen import generate_level
+from navigation import (DIRECTION_DELTAS, DIRECTIONS, UNREACHABLE, FlowField, FreeTable, MazeGraph,
+                        probe_exits)
+
+
+def bfs(graph, src):
+    dist = {src: 0}
+    queue = deque([src])
+    while queue:
+        node = queue.popleft()
+        for d in range(4):
+            if graph.exits[node] & (1 << d):
+                nxt = graph.neighbour(node, d)
+                if nxt not in dist:
+                    dist[nxt] = dist[node] + 1
+                    queue.append(nxt)
+    return dist
+
+
+def open_nodes(graph):
+    return [n for n in range(graph.cols * graph.rows) if graph.end[0][n] >= 0]
+
+
+def graphs():
+    default = load_level().graph
+    generated = compile_level(generate_level(8, 8, seed=3)).graph
+    # The same maze without its next-hop table routes by searching
+    searched = MazeGraph.from_bytes(generated.to_bytes())
+    searched.dist, searched.hop = [], bytearray()
+    return [default, generated, searched]
+
+
+@pytest.mark.parametrize("graph", graphs(), ids=["default", "generated", "searched"])
+def test_routes_match_bfs(graph):
+    nodes = open_nodes(graph)
+    distances = {node: bfs(graph, node) for node in nodes}
+    for src in nodes:
+        for dst in nodes:
+            expected = distances[src].get(dst)
+            assert graph.distance(src, dst) == expected
+            direction = graph.next_direction(src, dst)
+            if not expected:
+                assert direction is None
+                continue
+            # The first step is open and one step closer
+            assert graph.exits[src] & (1 << direction)
+            assert distances[graph.neighbour(src, direction)][dst] == expected - 1
+
+
+def test_route_by_pixel():
+    graph = load_level().graph
+    nodes = open_nodes(graph)
+    rng = random.Random(0)
+    for _ in range(200):
+        src, dst = rng.sample(nodes, 2)
+        direction = graph.route(graph.position(src), graph.position(dst))
+        assert direction == DIRECTIONS[graph.next_direction(src, dst)]
+    assert graph.route(graph.position(nodes[0]), graph.position(nodes[0])) is None
+    assert graph.route((-100, -100), graph.position(nodes[0])) is None
+
+
+def test_route_table_is_built_on_first_query():
+    graph = MazeGraph.from_bytes(compile_level(generate_level(6, 6, seed=5)).graph.to_bytes())
+    assert graph.hop is None
+    nodes = open_nodes(graph)
+    graph.next_direction(nodes[0], nodes[-1])
+    assert graph.has_routes
+
+
+def test_flow_field_matches_bfs():
+    graph = load_level().graph
+    nodes = open_nodes(graph)
+    field = FlowField(graph)
+    rng = random.Random(1)
+    target = nodes[0]
+    for _ in range(500):
+        # Mostly small moves, like a chased player, with some jumps
+        if rng.random() < 0.8 and field.neighbours[target]:
+            target = rng.choice(field.neighbours[target])
+        else:
+            target = rng.choice(nodes)
+        field.set_target(target)
+        expected = bfs(graph, target)
+        for node in nodes:
+            assert field.dist[node] == expected.get(node, UNREACHABLE)
+        for node in rng.sample(nodes, 20):
+            mask = field.direction(node)
+            closer = [d for d in range(4) if mask & (1 << d)]
+            assert bool(closer) == (expected.get(node, 0) > 0)
+            for d in closer:
+                assert expected[graph.neighbour(node, d)] == expected[node] - 1
+
+
+def test_chasing_ghosts_redecide_every_lattice_cell():
+    game = headless.make_game(0, chase=True)
+    assert [ghost.chase_steps for ghost in game.ghosts] == [10] * 4
+    # Generated mazes navigate on a 40 px lattice
+    game = headless.make_game(0, level=generate_level(6, 6, seed=1), chase=True, ghost_speed=3)
+    assert {ghost.chase_steps for ghost in game.ghosts} == {40 // 3}
+    game = headless.make_game(0, chase=True, ghost_speed=50)
+    assert {ghost.chase_steps for ghost in game.ghosts} == {1}
+
+
+def levels():
+    return [load_level(), compile_level(generate_level(12, 12, seed=5, loops=0.3))]
+
+
+@pytest.mark.parametrize("level", levels(), ids=["default", "generated"])
+def test_free_table_matches_probes(level):
+    walls = level.wall_index([Wall(*item) for item in level.walls])
+    bounds = pygame.Rect(0, 0, level.width, level.height)
+    free = level.ghost_free
+    rng = random.Random(3)
+    for _ in range(5000):
+        x, y = rng.randrange(-30, level.width + 30), rng.randrange(-30, level.height + 30)
+        rect = pygame.Rect(x, y, 24, 24)
+        assert free.free(x, y) == (bounds.contains(rect) and walls.any(rect) is None)
+    copy = FreeTable.from_bytes(free.to_bytes())
+    assert copy.patterns == free.patterns and copy.blocks == free.blocks
+
+
+@pytest.mark.parametrize("level", levels(), ids=["default", "generated"])
+@pytest.mark.parametrize("speed", [2, 3, 25])
+def test_move_table_matches_probes(level, speed):
+    table = level.move_table((24, 24), speed)
+    walls = level.wall_index([Wall(*item) for item in level.walls])
+    bounds = pygame.Rect(0, 0, level.width, level.height)
+    rng = random.Random(speed)
+    # Free spots and positions around them, including block edges
+    for _ in range(3000):
+        x, y = table.random_spot(rng)
+        x += rng.randrange(-45, 46)
+        y += rng.randrange(-45, 46)
+        rect = pygame.Rect(x, y, 24, 24)
+        expected = probe_exits(walls, rect, speed)
+        # The table also keeps ghosts inside the level
+        for d, (dx, dy) in enumerate(DIRECTION_DELTAS):
+            if not bounds.contains(rect.move(dx * speed, dy * speed)):
+                expected &= ~(1 << d)
+        assert table.exits_at(x, y) == expected
+    # One exit table per free-position pattern at most
+    assert len(table.pattern_exits) == len(table.free.patterns)
+
+
+def test_spots_are_free_and_reachable():
+    level = load_level()
+    table = level.move_table((24, 24), 2)
+    graph = level.graph
+    start = graph.node_at(*level.player)
+    reachable = bfs(graph, start)
+    for x, y in table.free_spots:
+        assert table.free.free(x, y)
+        assert graph.node_at(x + 12, y + 12) in reachable
+    # A spawn inside a wall moves to the closest free position
+    x, y = table.nearest_spot((5, 5))
+    assert table.free.free(x, y)
+    radius = (x - 5) ** 2 + (y - 5) ** 2
+    assert not any(table.free.free(5 + dx, 5 + dy)
+                   for dx in range(-40, 41) for dy in range(-40, 41)
+                   if dx * dx + dy * dy < radius)
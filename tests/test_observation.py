@@ -0,0 +1,89 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+import pygame
+
+import headless
+from game import Wall
+from mazegen import generate_level
+from observation import GRAY_WEIGHTS, FrameView, Observer
+
+
+def ghost_rows(game):
+    if game.swarm is not None:
+        swarm = game.swarm
+        return [(x, y, edible and alive, alive)
+                for x, y, edible, alive in zip(swarm.x, swarm.y, swarm.edible, swarm.alive)]
+    return None
+
+
+@pytest.mark.parametrize("options", [{}, {"swarm": True}], ids=["sprites", "swarm"])
+def test_buffers_follow_the_game(options):
+    game = headless.make_game(2, **options)
+    observer = Observer(game, num_envs=2)
+    buffers = observer.buffers
+    killed = 0
+    for seed in (2, 6):
+        game.reset(seed)
+        observer.track(1, game)
+        slots = game.ghost_list.sprites()
+        policy = headless.pellet_seeker_policy()
+        while not game.done and game.frame < 3000:
+            game.step(policy(game))
+            observer.fill(1, game)
+            player = game.player
+            assert buffers["player"][1].tolist() == [player.rect.x, player.rect.y,
+                                                    player.change_x, player.change_y]
+            assert buffers["pellets"][1].ravel().tolist() == list(game.pellets.cells)
+            assert buffers["power_pellets"][1].ravel().tolist() == list(game.power_pellets.cells)
+            assert buffers["power_timer"][1] == game.power_timer
+            assert buffers["edible"][1] == game.ghost_edible
+            expected = ghost_rows(game)
+            if expected is None:
+                expected = [(g.rect.x, g.rect.y, g.edible and g.alive(), g.alive()) for g in slots]
+            assert [tuple(row) for row in buffers["ghosts"][1].tolist()] == expected
+            killed = max(killed, len(expected) - sum(row[3] for row in expected))
+    # Eaten ghosts stay in their slot, marked as not alive
+    assert killed > 0
+    # The other slot is left alone
+    assert not buffers["player"][0].any() and not buffers["ghosts"][0].any()
+
+
+@pytest.mark.parametrize("level", ["default", generate_level(9, 7, seed=2)], ids=["default", "generated"])
+@pytest.mark.parametrize("wall_cell", [10, 7])
+def test_wall_mask_marks_blocks_with_walls(level, wall_cell):
+    game = headless.make_game(1, level=level)
+    observer = Observer(game, wall_cell=wall_cell)
+    walls = [Wall(*item).rect for item in game.level.walls]
+    rows, cols = observer.walls.shape
+    assert (rows, cols) == (game.level.height // wall_cell, game.level.width // wall_cell)
+    for j in range(rows):
+        for i in range(cols):
+            block = pygame.Rect(i * wall_cell, j * wall_cell, wall_cell, wall_cell)
+            assert observer.walls[j, i] == (block.collidelist(walls) != -1)
+
+
+def test_positions_beyond_16_bits():
+    game = headless.make_game(1)
+    observer = Observer(game)
+    game.player.rect.topleft = (40000, 70000)
+    observer.fill(0, game)
+    assert observer.buffers["player"][0, :2].tolist() == [40000, 70000]
+
+
+@pytest.mark.parametrize("grayscale", [True, False])
+@pytest.mark.parametrize("scale", [1, 3])
+def test_frame_view_samples_the_surface(grayscale, scale):
+    surface = pygame.Surface((50, 31))
+    rng = np.random.default_rng(4)
+    pygame.surfarray.blit_array(surface, rng.integers(0, 2 ** 24, (50, 31)))
+    view = FrameView((50, 31), scale=scale, grayscale=grayscale)
+    frame = view.capture(surface)
+    rgb = pygame.surfarray.array3d(surface).transpose(1, 0, 2)[::scale, ::scale]
+    if grayscale:
+        expected = (rgb.astype(np.uint32) * GRAY_WEIGHTS).sum(axis=2) >> 8
+    else:
+        expected = rgb
+    assert frame.shape == expected.shape and (frame == expected).all()
+    # The surface is unlocked again
+    assert not surface.get_locked()
@@ -0,0 +1,77 @@
+import random
+
+import pygame
+import pytest
+
+from game import Wall
+from levels import load_level
+from pellets import PelletGrid
+from spatial import SpatialGrid
+
+
+class PelletSprite(pygame.sprite.Sprite):
+    # A pellet the way it was before the lattice: one sprite per pellet
+    def __init__(self, grid, index):
+        super().__init__()
+        self.index = index
+        self.rect = grid.rect(index)
+
+
+class Eater(pygame.sprite.Sprite):
+    def __init__(self, rect):
+        super().__init__()
+        self.rect = rect
+
+
+@pytest.mark.parametrize("size", [5, 12])
+def test_eat_matches_sprite_overlap(size):
+    rng = random.Random(size)
+    grid = PelletGrid((20, 20), 20, 20, 17, size, (255, 255, 255))
+    for index in range(len(grid.cells)):
+        if rng.random() < 0.8:
+            grid.place(index)
+    sprites = pygame.sprite.Group(PelletSprite(grid, index) for index in grid)
+    for _ in range(3000):
+        rect = pygame.Rect(rng.randrange(-40, 440), rng.randrange(-40, 380),
+                           rng.randrange(1, 60), rng.randrange(1, 60))
+        covered = sorted(s.index for s in sprites if s.rect.colliderect(rect))
+        assert sorted(grid.overlapping(rect)) == covered
+        eaten = pygame.sprite.spritecollide(Eater(rect), sprites, True)
+        assert grid.eat(rect) == len(eaten)
+        assert grid.count == len(sprites)
+    assert sorted(grid) == sorted(s.index for s in sprites)
+
+
+def test_covering_includes_eaten():
+    grid = PelletGrid((20, 20), 20, 10, 10, 5, (255, 255, 255))
+    rect = pygame.Rect(15, 15, 30, 30)
+    assert grid.covering(rect) == [0, 1, 10, 11]
+    assert grid.overlapping(rect) == []
+
+
+def test_index_and_center():
+    grid = PelletGrid((20, 20), 20, 10, 10, 5, (255, 255, 255))
+    for index in range(100):
+        assert grid.index(*grid.center(index)) == index
+    assert grid.index(30, 20) is None
+    assert grid.index(0, 20) is None
+    assert grid.index(220, 20) is None
+
+
+def test_eaten_log():
+    grid = PelletGrid((20, 20), 20, 10, 10, 5, (255, 255, 255))
+    grid.load(bytes([1]) * 100)
+    grid.eat(pygame.Rect(15, 15, 30, 10))
+    assert grid.eaten == [0, 1]
+    grid.load(bytes([1]) * 100)
+    assert grid.eaten == [] and grid.count == 100
+
+
+def test_level_pellets_skip_walls():
+    # As the sprite version did: a pellet wherever its rect touches no wall
+    level = load_level()
+    walls = SpatialGrid(Wall(*item) for item in level.walls)
+    grid = level.pellet_grid()
+    grid.load(level.pellet_cells)
+    expected = [i for i in range(len(grid.cells)) if not walls.any(grid.rect(i))]
+    assert list(grid) == expected
@@ -0,0 +1,130 @@
+import random
+
+import pygame
+import pytest
+
+import headless
+from game import ACTIONS, BLACK, SCREEN_HEIGHT, SCREEN_WIDTH, WHITE
+from hud import Hud
+from mazegen import generate_level
+from render import MAX_INTERPOLATED_STEP, Renderer
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.quit()
+
+
+def full_redraw(game, renderer, surface):
+    # The whole world drawn from scratch, the way the game looked before
+    # dirty rectangles
+    surface.fill(BLACK)
+    for wall in game.level.walls:
+        surface.fill(WHITE, wall)
+    game.pellets.draw(surface)
+    game.power_pellets.draw(surface)
+    surface.blit(game.player.image, game.player.rect)
+    if game.use_swarm:
+        surface.blits(renderer._visible_ghosts(game, surface.get_rect()), doreturn=False)
+    else:
+        game.ghost_list.draw(surface)
+
+
+def same_pixels(a, b):
+    return pygame.image.tobytes(a, "RGB") == pygame.image.tobytes(b, "RGB")
+
+
+@pytest.mark.parametrize("swarm", [False, True], ids=["sprites", "swarm"])
+def test_dirty_rects_match_full_redraw(screen, swarm):
+    if swarm:
+        pytest.importorskip("numpy")
+    game = headless.make_game(5, swarm=swarm)
+    renderer = Renderer(screen, Hud())
+    hud = Hud()
+    reference = pygame.Surface(screen.get_size()).convert()
+    rng = random.Random(1)
+    for episode in range(2):
+        game.reset(episode)
+        for frame in range(600):
+            if frame % 15 == 0:
+                action = rng.choice(ACTIONS)
+            game.step(action)
+            renderer.draw(game)
+            full_redraw(game, renderer, reference)
+            hud.draw(reference, game)
+            assert same_pixels(screen, reference), (episode, frame)
+
+
+@pytest.mark.parametrize("swarm", [False, True], ids=["sprites", "swarm"])
+def test_scrolling_view_matches_the_world(screen, swarm):
+    if swarm:
+        pytest.importorskip("numpy")
+    level = generate_level(40, 40, seed=3, loops=0.5)
+    game = headless.make_game(2, level=level, ghost_count=30, swarm=swarm)
+    renderer = Renderer(screen, Hud())
+    hud = Hud()
+    world = pygame.Surface((game.level.width, game.level.height)).convert()
+    policy = headless.pellet_seeker_policy()
+    span = game.level.width - 60
+    for frame in range(120):
+        if frame % 10 == 0:
+            # Jumps across the level make the renderer recompose its window
+            game.player.rect.topleft = (15 + (frame * 37) % span, 15 + (frame * 23) % span)
+        game.step(policy(game))
+        renderer.draw(game)
+        # The view is centred on the player, short of the level edges
+        view = renderer.camera.rect
+        assert view == screen.get_rect(center=game.player.rect.center).clamp(world.get_rect())
+        full_redraw(game, renderer, world)
+        reference = world.subsurface(view).copy()
+        hud.draw(reference, game)
+        assert same_pixels(screen, reference), frame
+
+
+def interpolated(previous, alpha):
+    # Where draw() should place each sprite, as in main.py's loop
+    positions = {}
+    for sprite, (px, py) in previous:
+        x, y = sprite.rect.topleft
+        if abs(x - px) + abs(y - py) <= MAX_INTERPOLATED_STEP:
+            positions[sprite] = (round(px + (x - px) * alpha), round(py + (y - py) * alpha))
+    return positions
+
+
+@pytest.mark.parametrize("swarm", [False, True], ids=["sprites", "swarm"])
+def test_interpolated_frames_match_full_redraw(screen, swarm):
+    if swarm:
+        pytest.importorskip("numpy")
+    game = headless.make_game(8, swarm=swarm, ghost_count=6)
+    renderer = Renderer(screen, Hud())
+    hud = Hud()
+    reference = pygame.Surface(screen.get_size()).convert()
+    policy = headless.pellet_seeker_policy()
+    jumps = 0
+    for frame in range(400):
+        renderer.capture(game)
+        game.step(policy(game))
+        if game.done:
+            game.reset()
+            continue
+        if frame % 40 == 20:
+            # A jump like a respawn, drawn where it lands
+            game.player.rect.x += 30
+            game.player.dirty = 1
+        real = {sprite: sprite.rect.topleft for sprite, _ in renderer.previous}
+        jumps += len(interpolated(renderer.previous, 0)) < len(real)
+        # Several frames can be drawn per tick; the last one at the tick itself
+        for alpha in (0.25, 0.5, 1.0) if frame % 3 else (0.6,):
+            renderer.draw(game, alpha=alpha)
+            for sprite, position in interpolated(renderer.previous, alpha).items():
+                sprite.rect.topleft = position
+            full_redraw(game, renderer, reference)
+            for sprite, position in real.items():
+                sprite.rect.topleft = position
+            hud.draw(reference, game)
+            assert same_pixels(screen, reference), (frame, alpha)
+            # The simulation keeps the real positions
+            assert {sprite: sprite.rect.topleft for sprite in real} == real
+    assert jumps > 0
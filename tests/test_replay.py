@@ -0,0 +1,110 @@
+import json
+import random
+import struct
+
+import pytest
+
+import headless
+from game import PLAYER_SPEED, velocity_action
+from mazegen import generate_level
+from replay import MAGIC, SESSION, Recorder, make_recorded_game, read_replay, replay
+
+KEYS = {"left": (-PLAYER_SPEED, 0), "right": (PLAYER_SPEED, 0),
+        "up": (0, -PLAYER_SPEED), "down": (0, PLAYER_SPEED)}
+
+
+def record(game, sessions=3, frames=2000):
+    # Plays like main.py: key presses change the player's velocity, and the
+    # resulting action is recorded and stepped
+    recorder = Recorder(game)
+    rng = random.Random(9)
+    finals = []
+    for _ in range(sessions):
+        for _ in range(frames):
+            player = game.player
+            if rng.random() < 0.05 and not game.done:
+                player.changespeed(*KEYS[rng.choice(list(KEYS))])
+            action = velocity_action(player.change_x, player.change_y)
+            recorder.record(action)
+            game.step(action)
+        finals.append(game.state())
+        game.reset()
+        recorder.start(game.seed)
+    return recorder.getvalue(), finals
+
+
+def write_level(path, level):
+    path.write_text(json.dumps(level.to_dict()))
+    return str(path)
+
+
+@pytest.mark.parametrize("options", [{}, {"swarm": True, "ghost_count": 30}],
+                         ids=["sprites", "swarm"])
+def test_replay_reproduces_the_games(options):
+    data, finals = record(headless.make_game(123, **options))
+    states = replay(data)
+    # The last session was started but never played
+    assert len(states) == len(finals) + 1
+    assert states[:len(finals)] == finals
+
+
+def test_recording_is_run_length_encoded():
+    game = headless.make_game(7, ghost_count=5, swarm=True)
+    recorder = Recorder(game)
+    for action in [1] * 300 + [0] * 2 + [3]:
+        recorder.record(action)
+    recorder.start(2 ** 64 - 1)
+    recorder.record(4)
+    options, sessions = read_replay(recorder.getvalue())
+    assert options["swarm"] and not options["chase"] and options["ghost_count"] == 5
+    assert sessions == [(7, [(1, 300), (0, 2), (3, 1)]), (2 ** 64 - 1, [(4, 1)])]
+
+
+def test_recorder_refuses_seeds_over_64_bits():
+    recorder = Recorder(headless.make_game(1))
+    with pytest.raises(ValueError):
+        recorder.start(2 ** 64)
+    with pytest.raises(ValueError):
+        recorder.start(-1)
+
+
+def test_reset_with_a_seed_replays_the_session():
+    # A game picks its own seed when given none; resetting another game to
+    # that seed, after it played a different session, gives the same run
+    game = headless.make_game(None)
+    seed = game.seed
+    first = headless.run_episode(seed, max_frames=3000, game=game)
+    other = headless.make_game(seed + 1)
+    headless.run_episode(seed + 1, max_frames=500, game=other)
+    assert headless.run_episode(seed, max_frames=3000, game=other) == first
+
+
+def test_replay_keeps_the_level_and_options(tmp_path):
+    path = write_level(tmp_path / "maze.json", generate_level(10, 10, seed=4))
+    game = headless.make_game(5, level=path, ghost_count=9, chase=True)
+    data, finals = record(game, sessions=2)
+    options, sessions = read_replay(data)
+    assert options["level"] == path and options["level_key"] == game.level.key()
+    assert options["ghost_count"] == 9 and options["chase"]
+    assert len(sessions) == 3
+    assert replay(data)[:len(finals)] == finals
+
+
+def test_replay_refuses_a_changed_level(tmp_path):
+    level = generate_level(10, 10, seed=4)
+    path = write_level(tmp_path / "maze.json", level)
+    data, _ = record(headless.make_game(5, level=path), sessions=1, frames=10)
+    level.ghost_spawns = level.ghost_spawns[:1]
+    write_level(tmp_path / "maze.json", level)
+    with pytest.raises(ValueError):
+        make_recorded_game(read_replay(data)[0])
+
+
+def test_older_recordings_still_read():
+    runs = bytes([SESSION]) + struct.pack("<Q", 8) + bytes([2, 0x81, 0x01])
+    version_1 = MAGIC + struct.pack("<BBH", 1, 2, 4) + runs
+    version_2 = MAGIC + struct.pack("<BBH", 2, 0, 6) + bytes([7]) + b"default" + runs
+    assert read_replay(version_1) == ({"swarm": False, "chase": True, "ghost_count": 4},
+                                      [(8, [(2, 129)])])
+    assert read_replay(version_2) == ({"swarm": False, "chase": False, "ghost_count": 6,
+                                       "level": "default"}, [(8, [(2, 129)])])
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+import headless
+from mazegen import generate_level
+
+CONFIGS = {
+    "default": {},
+    "chase": {"chase": True},
+    "ghosts": {"ghost_count": 40},
+    "generated": {"level": generate_level(12, 12, seed=3), "ghost_count": 12, "chase": True},
+    "swarm": {"swarm": True, "ghost_count": 100},
+}
+
+
+def play(game, actions):
+    states = []
+    for action in actions:
+        game.step(action)
+        states.append(game.state())
+    return states
+
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_restore_replays_the_same_game(name):
+    if CONFIGS[name].get("swarm"):
+        pytest.importorskip("numpy")
+    for seed in range(3):
+        rng = random.Random(seed)
+        actions = [rng.randrange(5) if i % 10 == 0 else None for i in range(1500)]
+        split = rng.randrange(100, 700)
+        game = headless.make_game(seed, **CONFIGS[name])
+        play(game, actions[:split])
+        snapshot = game.snapshot()
+        later = play(game, actions[split:])
+        end = game.snapshot()
+
+        # Rolled back in place
+        game.restore(snapshot)
+        assert play(game, actions[split:]) == later
+        assert game.snapshot() == end
+
+        # Restored into another game that was somewhere else
+        other = headless.make_game(seed + 100, **CONFIGS[name])
+        play(other, [rng.randrange(5) for _ in range(200)])
+        other.restore(snapshot)
+        assert play(other, actions[split:]) == later
+        assert other.snapshot() == end
+
+
+def test_restore_brings_back_eaten_pellets_and_ghosts():
+    game = headless.make_game(1)
+    snapshot = game.snapshot()
+    pellets = bytes(game.pellets.cells)
+    ghosts = game.ghost_list.sprites()
+    policy = headless.pellet_seeker_policy()
+    while not game.done:
+        game.step(policy(game))
+    assert bytes(game.pellets.cells) != pellets
+    ghosts[0].kill()
+    game.restore(snapshot)
+    assert bytes(game.pellets.cells) == pellets
+    assert game.ghost_list.sprites() == ghosts and not game.done
+    assert game.state() == headless.make_game(1).state()
+
+
+def test_restore_refuses_another_setup():
+    snapshot = headless.make_game(1).snapshot()
+    with pytest.raises(ValueError):
+        headless.make_game(1, ghost_count=5).restore(snapshot)
+    with pytest.raises(ValueError):
+        headless.make_game(1, level=generate_level(6, 6, seed=1)).restore(snapshot)
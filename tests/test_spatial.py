@@ -0,0 +1,58 @@
+import random
+
+import pygame
+
+from game import Wall
+from levels import load_level
+from spatial import SpatialGrid
+
+
+class Probe(pygame.sprite.Sprite):
+    def __init__(self, rect):
+        super().__init__()
+        self.rect = rect
+
+
+def random_rect(rng, width, height):
+    return pygame.Rect(rng.randrange(-50, width), rng.randrange(-50, height),
+                       rng.randrange(1, 120), rng.randrange(1, 120))
+
+
+def random_walls(rng, count=200):
+    # Overlapping walls of every size, some bigger than a grid cell
+    return [Wall(*random_rect(rng, 420, 360)) for _ in range(count)]
+
+
+def test_collide_matches_spritecollide():
+    rng = random.Random(0)
+    for walls in (random_walls(rng), [Wall(*item) for item in load_level().walls]):
+        group = pygame.sprite.Group(walls)
+        grid = SpatialGrid(walls)
+        for _ in range(2000):
+            probe = Probe(random_rect(rng, 420, 360))
+            expected = pygame.sprite.spritecollide(probe, group, False)
+            # Same walls in the same (insertion) order
+            assert grid.collide(probe.rect) == expected
+            hit = grid.any(probe.rect)
+            assert (hit is None) == (not expected)
+            assert hit is None or hit in expected
+
+
+def test_from_buckets_matches_adding():
+    rng = random.Random(1)
+    walls = random_walls(rng)
+    grid = SpatialGrid(walls)
+    buckets = {cell: [walls.index(wall) for wall in bucket] for cell, bucket in grid.cells.items()}
+    rebuilt = SpatialGrid.from_buckets(walls, buckets)
+    assert len(rebuilt) == len(grid)
+    for _ in range(500):
+        rect = random_rect(rng, 420, 360)
+        assert rebuilt.collide(rect) == grid.collide(rect)
+
+
+def test_clear():
+    grid = SpatialGrid(random_walls(random.Random(2)))
+    grid.clear()
+    assert len(grid) == 0
+    assert grid.collide(pygame.Rect(0, 0, 420, 360)) == []
+    assert grid.any(pygame.Rect(0, 0, 420, 360)) is None
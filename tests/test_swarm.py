@@ -0,0 +1,115 @@
+import pygame
+import pytest
+
+import headless
+from mazegen import generate_level
+
+np = pytest.importorskip("numpy")
+
+DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def swarm_game(**options):
+    game = headless.make_game(3, swarm=True, ghost_count=300, **options)
+    swarm = game.swarm
+    return game, swarm, game.level.move_table(swarm.size, swarm.speed)
+
+
+@pytest.mark.parametrize("options", [{}, {"ghost_speed": 3},
+                                     {"level": generate_level(15, 15, seed=2)}],
+                         ids=["default", "speed3", "generated"])
+def test_swarm_follows_ghost_rules(options):
+    # The rules of Ghost.update, ghost by ghost: keep going while the way is
+    # open and steps remain, else turn to a random open exit for 15-60
+    # steps; a blocked ghost stands still and counts towards a teleport
+    game, swarm, moves = swarm_game(**options)
+    speed = swarm.speed
+    spots = set(moves.free_spots)
+    turns = 0
+    for _ in range(400):
+        before = list(zip(swarm.x.tolist(), swarm.y.tolist(), swarm.direction.tolist(),
+                          swarm.steps_remaining.tolist(), swarm.stuck_counter.tolist()))
+        swarm.update()
+        for k, (x, y, d, steps, stuck) in enumerate(before):
+            nx, ny, nd = int(swarm.x[k]), int(swarm.y[k]), int(swarm.direction[k])
+            exits = moves.exits_at(x, y)
+            turn = steps <= 0 or not exits & (1 << d)
+            if turn and exits:
+                assert exits & (1 << nd)
+                turns += 1
+            else:
+                assert nd == d
+            if exits & (1 << nd):
+                dx, dy = DELTAS[nd]
+                assert (nx, ny) == (x + dx * speed, y + dy * speed)
+                assert swarm.stuck_counter[k] == 0
+                expected_steps = range(14, 60) if turn else [steps - 1]
+                assert swarm.steps_remaining[k] in expected_steps
+            else:
+                assert swarm.steps_remaining[k] == 0
+                if stuck + 1 > 60:
+                    # Stuck too long: teleported to a free spot
+                    assert (nx, ny) in spots
+                    assert swarm.stuck_counter[k] == 0
+                else:
+                    assert (nx, ny) == (x, y)
+                    assert swarm.stuck_counter[k] == stuck + 1
+    assert turns
+
+
+def test_stuck_ghosts_teleport_to_free_spots():
+    game, swarm, moves = swarm_game()
+    # Off the level every way is blocked
+    swarm.x[:10] = -100
+    swarm.y[:10] = -100
+    swarm.stuck_counter[:10] = 59
+    swarm.update()
+    assert (swarm.x[:10] == -100).all() and (swarm.stuck_counter[:10] == 60).all()
+    swarm.update()
+    spots = set(moves.free_spots)
+    assert all((x, y) in spots for x, y in zip(swarm.x[:10].tolist(), swarm.y[:10].tolist()))
+    assert (swarm.stuck_counter[:10] == 0).all()
+
+
+def test_swarm_never_touches_walls():
+    game, swarm, moves = swarm_game(level=generate_level(15, 15, seed=4, loops=0.3))
+    walls = [pygame.Rect(item) for item in game.level.walls]
+    w, h = swarm.size
+    for frame in range(300):
+        swarm.update()
+        if frame % 10 == 0:
+            for x, y in zip(swarm.x.tolist(), swarm.y.tolist()):
+                assert pygame.Rect(x, y, w, h).collidelist(walls) < 0
+
+
+def test_fits_matches_free_table():
+    game, swarm, moves = swarm_game()
+    level = game.level
+    ys, xs = np.mgrid[-5:level.height + 5, -5:level.width + 5]
+    fits = swarm._fits(xs.ravel(), ys.ravel())
+    expected = [moves.free.free(x, y) for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())]
+    assert fits.tolist() == [bool(flag) for flag in expected]
+
+
+def test_spawns_match_sprite_ghosts():
+    game, swarm, moves = swarm_game()
+    sprites = headless.make_game(3, ghost_count=4)
+    assert [(int(x), int(y)) for x, y in zip(swarm.x[:4], swarm.y[:4])] == \
+        [ghost.rect.topleft for ghost in sprites.ghosts]
+
+
+def test_reset_reuses_the_swarm():
+    game, swarm, moves = swarm_game()
+    x = swarm.x
+    spawn = swarm.x.copy(), swarm.y.copy()
+    for _ in range(50):
+        game.step(None)
+    swarm.kill([0, 1, 2])
+    game.reset(5)
+    assert game.swarm is swarm and swarm.x is x
+    assert (swarm.x == spawn[0]).all() and (swarm.y == spawn[1]).all()
+    assert swarm.alive.all() and len(swarm) == 300
+    # Same seed, same swarm
+    first = swarm.snapshot()
+    game.reset(5)
+    assert swarm.snapshot() == first
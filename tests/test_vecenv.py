@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import headless
+from vecenv import VecEnv
+
+
+class Reference:
+    # The same sessions as VecEnv, played one separate Game each, with seeds
+    # handed out in the same order
+    def __init__(self, num_envs, seed, max_frames, **options):
+        self.seeds = random.Random(seed)
+        self.max_frames = max_frames
+        self.games = [headless.make_game(self.seeds.getrandbits(63), **options)
+                      for _ in range(num_envs)]
+
+    def step(self, actions):
+        rewards, episodes = [], []
+        for game, action in zip(self.games, actions):
+            before = game.score
+            game.step(action)
+            rewards.append(game.score - before)
+            truncated = self.max_frames is not None and game.frame >= self.max_frames
+            if game.done or truncated:
+                episodes.append({"score": game.score, "frames": game.frame, "win": game.win,
+                                 "truncated": truncated and not game.done})
+                game.reset(self.seeds.getrandbits(63))
+            else:
+                episodes.append(None)
+        return rewards, episodes
+
+
+@pytest.mark.parametrize("options", [{}, {"swarm": True, "ghost_count": 20}],
+                         ids=["sprites", "swarm"])
+def test_steps_match_separate_games(options):
+    env = VecEnv(4, seed=3, max_frames=400, **options)
+    reference = Reference(4, 3, 400, **options)
+    rng = random.Random(1)
+    finished = 0
+    for _ in range(1200):
+        actions = np.array([rng.randrange(5) for _ in range(4)])
+        observations, rewards, dones, infos = env.step(actions)
+        expected, episodes = reference.step(actions.tolist())
+        assert rewards.tolist() == expected
+        for i, episode in enumerate(episodes):
+            assert dones[i] == (episode is not None)
+            assert infos[i].get("episode") == episode
+            finished += episode is not None
+        for i, game in enumerate(reference.games):
+            # Observations are of the reset game when a session finished
+            assert tuple(observations["player"][i, :2]) == game.player.rect.topleft
+            assert env.games[i].state() == game.state()
+    assert finished >= 8
+
+
+def test_reset_with_a_seed_is_reproducible():
+    env = VecEnv(3, seed=5, max_frames=300)
+    runs = []
+    for _ in range(2):
+        first = {key: value.copy() for key, value in env.reset(11).items()}
+        rewards = []
+        for frame in range(400):
+            _, reward, done, _ = env.step(np.full(3, frame % 5))
+            rewards.append((reward.tolist(), done.tolist()))
+        runs.append((first, rewards, [game.seed for game in env.games]))
+    (first_a, rewards_a, seeds_a), (first_b, rewards_b, seeds_b) = runs
+    assert all(np.array_equal(first_a[key], first_b[key]) for key in first_a)
+    assert rewards_a == rewards_b and seeds_a == seeds_b
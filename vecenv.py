@@ -0,0 +1,62 @@
+# Vectorized environment for training agents: N independent game sessions in
+# one process, stepped together with one action array. Observations, rewards
+# (score gained) and done flags come back as NumPy arrays. Finished sessions
+# reset automatically with the next seed; their final score is reported in
+# the matching infos entry. Observations are observation.Observer buffers;
+# the static wall mask is VecEnv.walls.
+#
+# Requires NumPy.
+import random
+
+import numpy as np
+
+from headless import make_game
+from observation import Observer
+
+
+class VecEnv:
+    def __init__(self, num_envs, seed=0, max_frames=None, **options):
+        # options are passed to Game (ghost_count, swarm, chase)
+        self.num_envs = num_envs
+        self.max_frames = max_frames
+        self.seeds = random.Random(seed)
+        self.games = [make_game(self._next_seed(), **options) for _ in range(num_envs)]
+        self.observer = Observer(self.games[0], num_envs)
+        self.observations = self.observer.buffers
+        self.walls = self.observer.walls
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        for i, game in enumerate(self.games):
+            self.observer.track(i, game)
+            self.observer.fill(i, game)
+
+    def _next_seed(self):
+        return self.seeds.getrandbits(63)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seeds.seed(seed)
+        for i, game in enumerate(self.games):
+            game.reset(self._next_seed())
+            self.observer.track(i, game)
+            self.observer.fill(i, game)
+        return self.observations
+
+    def step(self, actions):
+        # Returns (observations, rewards, dones, infos); the arrays are reused
+        # by the next call, so copy anything that must outlive it
+        infos = [{} for _ in range(self.num_envs)]
+        rewards = self.rewards
+        dones = self.dones
+        for i, game in enumerate(self.games):
+            reward, done = game.step(int(actions[i]))
+            truncated = self.max_frames is not None and game.frame >= self.max_frames
+            rewards[i] = reward
+            dones[i] = done or truncated
+            if dones[i]:
+                infos[i]["episode"] = {"score": game.score, "frames": game.frame,
+                                       "win": game.win, "truncated": truncated and not done}
+                game.reset(self._next_seed())
+                self.observer.track(i, game)
+            self.observer.fill(i, game)
+        return self.observations, rewards, dones, infos